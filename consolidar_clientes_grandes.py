@@ -1,14 +1,31 @@
 import pandas as pd
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from funciones_auxiliares.funciones_principales import (configurar_rutas, cargar_datos_clientes)
+from funciones_auxiliares.funciones_excel import guardar_consolidado
 from funciones_auxiliares.funciones_clientes_grandes import (procesar_promotora, procesar_makro ,procesar_farmatodo)
 
-def actualizar_consolidado_y_guardar_excel(datos):
+def procesar_clientes_grandes(datos):
+    """
+    Procesa una sola vez cada cliente grande y devuelve sus resultados
+    (consolidado, detalle por ciudad) para reutilizarlos en ambos consolidados.
+    Los tres clientes usan tablas de entrada distintas, así que se procesan en hilos paralelos.
+    """
+    procesadores = {
+        'PROMOTORA': procesar_promotora,
+        'MAKRO': procesar_makro,
+        'FARMATODO': procesar_farmatodo
+    }
+    with ThreadPoolExecutor(max_workers=len(procesadores)) as executor:
+        futuros = {cliente: executor.submit(procesar, datos) for cliente, procesar in procesadores.items()}
+        return {cliente: futuro.result() for cliente, futuro in futuros.items()}
+
+def actualizar_consolidado_y_guardar_excel(datos, resultados, config, formato="excel"):
     
-    consolidado_promotora, _ = procesar_promotora(datos)
-    consolidado_makro, _ = procesar_makro(datos)
-    consolidado_farmatodo, _ = procesar_farmatodo(datos)
+    consolidado_promotora, _ = resultados['PROMOTORA']
+    consolidado_makro, _ = resultados['MAKRO']
+    consolidado_farmatodo, _ = resultados['FARMATODO']
 
     dataframes = [datos['tabla_sell_out_consolidado']]
 
@@ -21,21 +38,24 @@ def actualizar_consolidado_y_guardar_excel(datos):
     if consolidado_farmatodo is not None:
         dataframes.append(pd.DataFrame([consolidado_farmatodo]))
 
-    df_sell_out_actualizado = pd.concat(dataframes, ignore_index=True)
+    if len(dataframes) == 1:
+        df_sell_out_actualizado = dataframes[0]
+    else:
+        df_sell_out_actualizado = pd.concat(dataframes, ignore_index=True)
 
     nombre_archivo_excel =  "Tiendas Sell out.xlsx"
     ruta_salida = os.path.join(config['salida'], nombre_archivo_excel)
-    df_sell_out_actualizado.to_excel(ruta_salida, index=False)
+    ruta_salida = guardar_consolidado(df_sell_out_actualizado, ruta_salida, formato)
 
     print(f" Consolidado actualizado y guardado en {ruta_salida}")
 
     return df_sell_out_actualizado
 
-def actualizar_consolidado_sell_out_ciudades_y_guardar_excel(datos):
+def actualizar_consolidado_sell_out_ciudades_y_guardar_excel(datos, resultados, config, formato="excel"):
 
-    _, df_promotora = procesar_promotora(datos)
-    _, df_makro = procesar_makro(datos)
-    _, df_farmatodo = procesar_farmatodo(datos)
+    _, df_promotora = resultados['PROMOTORA']
+    _, df_makro = resultados['MAKRO']
+    _, df_farmatodo = resultados['FARMATODO']
 
     dataframes_ciudades = []
 
@@ -56,29 +76,41 @@ def actualizar_consolidado_sell_out_ciudades_y_guardar_excel(datos):
         print("No hay datos para consolidar Sell Out Ciudades.")
         return None
 
-    df_sell_out_actualizado_ciudades = pd.concat(dataframes_ciudades, ignore_index=True)
+    if len(dataframes_ciudades) == 1:
+        df_sell_out_actualizado_ciudades = dataframes_ciudades[0]
+    else:
+        df_sell_out_actualizado_ciudades = pd.concat(dataframes_ciudades, ignore_index=True)
 
     nombre_archivo_excel = "Tiendas Sell out ciudad descripcion.xlsx"
     ruta_salida = os.path.join(config['salida'], nombre_archivo_excel)
-    df_sell_out_actualizado_ciudades.to_excel(ruta_salida, index=False)
+    ruta_salida = guardar_consolidado(df_sell_out_actualizado_ciudades, ruta_salida, formato)
 
     print(f" Consolidado actualizado y guardado en {ruta_salida}")
     return df_sell_out_actualizado_ciudades
 
 
-# 1. CONFIGURACIÓN INICIAL
-print("📁 Configurando rutas y parámetros...")
-config = configurar_rutas()
+def main(config):
 
-# 2. CARGA DE DATOS
-print("\n📊 Cargando datos desde archivos Excel...")
-datos = cargar_datos_clientes(config)
+    # 2. CARGA DE DATOS
+    print("\n📊 Cargando datos desde archivos Excel...")
+    datos = cargar_datos_clientes(config)
 
-# 3. PROCESAMIENTO DE CLIENTES GRANDES
-## 3.1 Actualización tabla Sell out 
-print("\n 🔄 Creando consolidado Sell Out...")
-actualizar_consolidado_y_guardar_excel(datos)
+    # 3. PROCESAMIENTO DE CLIENTES GRANDES
+    resultados = procesar_clientes_grandes(datos)
 
-## 3.2 Actualización tabla Sell out Ciudad y Descripción
-print("\n 🔄 Creando consolidado Sell Out Ciudad Descripción...")
-actualizar_consolidado_sell_out_ciudades_y_guardar_excel(datos)
+    ## 3.1 Actualización tabla Sell out 
+    print("\n 🔄 Creando consolidado Sell Out...")
+    actualizar_consolidado_y_guardar_excel(datos, resultados, config, config['formato_consolidados'])
+
+    ## 3.2 Actualización tabla Sell out Ciudad y Descripción
+    print("\n 🔄 Creando consolidado Sell Out Ciudad Descripción...")
+    actualizar_consolidado_sell_out_ciudades_y_guardar_excel(datos, resultados, config, config['formato_consolidados'])
+
+
+if __name__ == "__main__":
+
+    # 1. CONFIGURACIÓN INICIAL
+    print("📁 Configurando rutas y parámetros...")
+    config = configurar_rutas()
+
+    main(config)
@@ -49,6 +49,16 @@ ARCHIVOS_SALIDA = {
     'SELL_OUT_CIUDAD': "tiendas_sell_out_ciudad_descripcion.xlsx"
 }
 
+# MOTOR DE LECTURA DE EXCEL (python-calamine, basado en Rust; openpyxl si no está instalado)
+try:
+    import python_calamine
+    MOTOR_EXCEL = 'calamine'
+except ImportError:
+    MOTOR_EXCEL = 'openpyxl'
+
+# FORMATO DE LOS CONSOLIDADOS DE CLIENTES GRANDES Y DE COSTOS ('excel' o 'parquet', este último requiere pyarrow)
+FORMATO_CONSOLIDADOS = 'excel'
+
 # CONFIGURACIÓN DE FECHAS
 FECHAS = {
     'ULTIMA_FECHA_CONSOLIDADO': pd.Timestamp("2025-01-01")
@@ -82,7 +92,8 @@ PANDAS_CONFIG = {
     'display.max_columns': None,
     'display.width': None,
     'display.max_colwidth': 50,
-    'display.precision': 2
+    'display.precision': 2,
+    'mode.copy_on_write': True
 }
 
 def aplicar_configuracion_pandas():
@@ -1,80 +1,143 @@
 import pandas as pd
 import numpy as np
 import re
+import warnings
 from datetime import datetime
 
+MARCA_MAPPING = {
+    "NAT": "001 - NATURESSE",
+    "JDE": "002 - JARDIN DE EVA",
+    "CED": "003 - CEDRELA",
+    "AMA": "004 - AMATISTA",
+    "INM": "006 - INMARCESIBLE",
+    "MED": "007 - MEDELA",
+    "AWA": "008 - AWARA",
+    "PER": "010 - PERSONALIZADO"
+}
+
+MAKRO_MULTIPLICADORES = {
+    "15GR X 12UND X 32PQ": 32,
+    "48UND": 48,
+    "6UND": 6
+}
+
+RE_TIENE_X = re.compile(r"(?i)\s+X\s*\d")
+RE_CANTIDAD = re.compile(r"X\s*(\d+\S*)", re.IGNORECASE)
+RE_SEPARAR_CANTIDAD = re.compile(r"\s+X\s*\d")
+RE_ESPACIOS = re.compile(r"\s+")
+
+CANTIDAD_REEMPLAZOS = {
+    "2 UND": "2UND",
+    "500 ML": "500ML",
+    "400 ML": "400ML"
+}
+
+PRODUCTO_REEMPLAZOS = {
+    "CREM": "CREMA", "CREMAA": "CREMA",
+    "HUME": "HUMEC", "HUMECC": "HUMEC",
+    "LIQ": "LIQU", "LIQUU": "LIQU",
+    "FLORY": "FLOR Y", "ANTIOX": "ANTI",
+    "ANTIMOSQ": "ANTI MOSQ", "ANTMOSQ": "ANTI MOSQ",
+    "JDE COMB CONC": "JDE COMB CONE",
+    "RESPIRA": "RESP", "RELAJATE": "RELA",
+    "SALES": "SALE", "EFER ACTI": "EFER ACT",
+    "EFERV": "EFER", "PER JAB VEG SPA": "PER JAB VEG",
+    "NAT ACOND": "NAT ACON", "NAT GEL DUCH": "NAT GEL DUCHA",
+    "JABO": "JABON", "JABONN": "JABON",
+    "ANTIBAC": "ANTI", "SHAM KER": "SHAM KERA",
+    "SHAM KERAA": "SHAM KERA", "NAT SPLA SLEE NIGH": "NAT SPLASH SLEEPFUL NIGHT"
+}
+
+RE_CANTIDAD_REEMPLAZOS = re.compile(
+    r"\b(" + "|".join(re.escape(old) for old in sorted(CANTIDAD_REEMPLAZOS, key=len, reverse=True)) + r")\b"
+)
+RE_PRODUCTO_REEMPLAZOS = re.compile(
+    r"\b(" + "|".join(re.escape(key) for key in sorted(PRODUCTO_REEMPLAZOS, key=len, reverse=True)) + r")\b"
+)
+
+# Formato en que llegan las fechas cuando las tablas se leen como texto (dtype=str).
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+def convertir_fechas(fechas, errors="coerce"):
+    """
+    Convierte una columna de fechas a datetime intentando primero el formato conocido de las tablas.
+
+    Con el formato explícito pandas usa su conversión rápida; solo los valores no nulos que no
+    cumplen el formato (por ejemplo filas de totales) se convierten con la inferencia general de pandas.
+
+    Parámetros:
+        fechas (pd.Series): Fechas como texto o ya convertidas.
+        errors (str): Manejo de valores inválidos en la conversión general ("coerce" o "raise").
+
+    Returns:
+        pd.Series: Fechas convertidas a datetime.
+    """
+    if pd.api.types.is_datetime64_any_dtype(fechas):
+        return fechas
+
+    convertidas = pd.to_datetime(fechas, format=FORMATO_FECHA, errors="coerce", cache=True)
+    fallidas = (convertidas.isna() & fechas.notna()).to_numpy()
+    if fallidas.any():
+        # Los valores fallidos suelen ser filas de totales ("Total"); sin formato común, pandas
+        # avisa que los interpreta uno a uno, lo cual es esperado aquí.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            convertidas[fallidas] = pd.to_datetime(fechas[fallidas], errors=errors, cache=True).to_numpy()
+    return convertidas
+
+
 def asignar_marca(desc, marca_actual):
     """
-    Asigna la marca correspondiente según un prefijo en la descripción, solo si la marca actual está vacía.
+    Asigna la marca correspondiente según el prefijo de la descripción, solo en las filas donde la marca actual está vacía.
 
     Parámetros:
-        desc (str): Descripción del producto.
-        marca_actual (str): Valor actual de la marca.
+        desc (pd.Series): Descripciones de los productos.
+        marca_actual (pd.Series): Valores actuales de la marca.
 
     Returns:
-        str: Marca asignada según el prefijo, o la marca original si ya estaba presente.
-    """
-    marca_mapping = {
-        "NAT": "001 - NATURESSE",
-        "JDE": "002 - JARDIN DE EVA",
-        "CED": "003 - CEDRELA",
-        "AMA": "004 - AMATISTA",
-        "INM": "006 - INMARCESIBLE",
-        "MED": "007 - MEDELA",
-        "AWA": "008 - AWARA",
-        "PER": "010 - PERSONALIZADO"
-    } 
-  
-    if pd.isna(marca_actual): 
-        for key, value in marca_mapping.items():
-            if isinstance(desc, str) and desc.startswith(key):
-                return value
-    return marca_actual
+        pd.Series: Marcas asignadas según el prefijo, conservando la marca original donde ya estaba presente.
+    """
+    marca_por_prefijo = desc.str.slice(0, 3).map(MARCA_MAPPING)
+    return marca_actual.where(marca_actual.notna(), marca_por_prefijo)
 
 
 def tiene_x(desc):
     """
-    Verifica si la descripción contiene una cantidad precedida por 'X' (mayúscula o minúscula).
+    Verifica si cada descripción contiene una cantidad precedida por 'X' (mayúscula o minúscula).
 
     Parámetros:
-        desc (str): Descripción del producto.
+        desc (pd.Series): Descripciones de los productos.
 
     Returns:
-        bool: True si se encuentra una coincidencia tipo "X número", False si no.
+        pd.Series: True donde se encuentra una coincidencia tipo "X número", False si no.
     """
-    return bool(re.search(r"(?i)\s+X\s*\d", str(desc)))
+    return desc.astype(str).str.contains(RE_TIENE_X)
 
 def extraer_cantidad(desc):
     """
     Extrae la cantidad del producto que aparece después de una 'X', como "X12UND" o "x 400ml".
 
     Parámetros:
-        desc (str): Descripción del producto.
+        desc (pd.Series): Descripciones de los productos.
 
     Returns:
-        str: La cantidad encontrada, o "NA" si no se encuentra.
+        pd.Series: La cantidad encontrada en cada fila, o "NA" si no se encuentra o la descripción no es texto.
     """
-    if pd.isna(desc) or not isinstance(desc, str): 
-        return "NA"
-    
-    match = re.search(r"X\s*(\d+\S*)", desc, re.IGNORECASE)
-    return match.group(1) if match else "NA"
+    return desc.str.extract(RE_CANTIDAD, expand=False).fillna("NA")
 
 def extraer_producto(desc):
     """
     Extrae el nombre del producto antes de una indicación de cantidad como "X 12UND".
     
     Parámetros:
-        desc (str): Descripción del producto.
+        desc (pd.Series): Descripciones de los productos.
 
     Returns:
-        str: Parte de la descripción correspondiente al producto, sin la parte de la cantidad.
+        pd.Series: Parte de la descripción correspondiente al producto, sin la parte de la cantidad.
+        Los valores que no son texto se conservan sin cambios.
     """
-    if pd.isna(desc) or not isinstance(desc, str): 
-        return desc
-    
-    partes = re.split(r"\s+X\s*\d", desc, maxsplit=1)
-    return partes[0].strip() if partes else desc.strip()
+    producto = desc.str.split(RE_SEPARAR_CANTIDAD, n=1, regex=True).str[0].str.strip()
+    return producto.fillna(desc)
   
 
 def normalizar_cantidad(cantidad):
@@ -82,46 +145,35 @@ def normalizar_cantidad(cantidad):
     Normaliza cadenas que representan cantidades para asegurar uniformidad en el formato.
 
     Parámetros:
-        cantidad (str): Cantidad original (ej. "500 ML").
+        cantidad (pd.Series): Cantidades originales (ej. "500 ML").
 
     Returns:
-        str: Cantidad normalizada (ej. "500ML"), o "NA" si está vacía o nula.
-    """
-    cantidad_replacements = {
-        "2 UND": "2UND",
-        "500 ML": "500ML",
-        "400 ML": "400ML"
-    }
-    if pd.isna(cantidad) or cantidad.strip() == "":
-        return "NA"
-    cantidad = cantidad.upper().strip()
-    for old, new in cantidad_replacements.items():
-        cantidad = re.sub(rf"\b{re.escape(old)}\b", new, cantidad)
-    cantidad = re.sub(r"\s+", " ", cantidad)
-    return cantidad
-
-def calcular_cantidad_sell_int(row):
+        pd.Series: Cantidades normalizadas (ej. "500ML"), o "NA" donde están vacías o nulas.
+    """
+    limpia = cantidad.str.upper().str.strip()
+    limpia = limpia.str.replace(RE_CANTIDAD_REEMPLAZOS, lambda m: CANTIDAD_REEMPLAZOS[m.group(1)], regex=True)
+    limpia = limpia.str.replace(RE_ESPACIOS, " ", regex=True)
+    return limpia.where(cantidad.notna() & limpia.ne(""), "NA")
+
+def calcular_cantidad_sell_int(tabla):
     """
     Calcula la cantidad interna de producto considerando multiplicadores especiales para Makro.
 
     Parámetros:
-        row (pd.Series): Fila de un DataFrame que contiene las claves 'Cantidad inv.', 'Razon social', 'Marca' y 'Cantidades'.
+        tabla (pd.DataFrame): DataFrame que contiene las columnas 'Cantidad inv.', 'Razon social', 'Marca' y 'Cantidades'.
 
     Returns:
-        int: Cantidad ajustada según el multiplicador correspondiente.
+        pd.Series: Cantidades ajustadas según el multiplicador correspondiente a cada fila.
     """
-
-    makro_multiplicadores = {
-        "15GR X 12UND X 32PQ": 32,
-        "48UND": 48,
-        "6UND": 6
-    }
-
-    cantidad = int(row["Cantidad inv."]) 
-    
-    if row["Razon social"] == "MAKRO SUPERMAYORISTA SAS" and row["Marca"] == "001 - NATURESSE":
-        return cantidad * makro_multiplicadores.get(row["Cantidades"], 24)
-    return cantidad
+    cantidad = pd.to_numeric(tabla["Cantidad inv."]).astype("int64")
+    multiplicador = tabla["Cantidades"].map(MAKRO_MULTIPLICADORES).fillna(24).astype("int64")
+    es_makro_naturesse = (
+        tabla["Razon social"].eq("MAKRO SUPERMAYORISTA SAS") & tabla["Marca"].eq("001 - NATURESSE")
+    )
+    return pd.Series(
+        np.where(es_makro_naturesse, cantidad * multiplicador, cantidad),
+        index=tabla.index
+    )
 
 
 def normalizar_producto(producto):
@@ -129,32 +181,11 @@ def normalizar_producto(producto):
     Normaliza la descripción del producto unificando sinónimos, errores tipográficos y abreviaciones.
 
     Parámetros:
-        producto (str): Nombre o descripción del producto.
+        producto (pd.Series): Nombres o descripciones de los productos.
 
     Returns:
-        str: Producto normalizado, sin errores comunes ni variaciones innecesarias.
-    """
-
-    replacements = {
-        "CREM": "CREMA", "CREMAA": "CREMA",
-        "HUME": "HUMEC", "HUMECC": "HUMEC",
-        "LIQ": "LIQU", "LIQUU": "LIQU",
-        "FLORY": "FLOR Y", "ANTIOX": "ANTI",
-        "ANTIMOSQ": "ANTI MOSQ", "ANTMOSQ": "ANTI MOSQ",
-        "JDE COMB CONC": "JDE COMB CONE",
-        "RESPIRA": "RESP", "RELAJATE": "RELA",
-        "SALES": "SALE", "EFER ACTI": "EFER ACT",
-        "EFERV": "EFER", "PER JAB VEG SPA": "PER JAB VEG",
-        "NAT ACOND": "NAT ACON", "NAT GEL DUCH": "NAT GEL DUCHA",
-        "JABO": "JABON", "JABONN": "JABON",
-        "ANTIBAC": "ANTI", "SHAM KER": "SHAM KERA",
-        "SHAM KERAA": "SHAM KERA", "NAT SPLA SLEE NIGH": "NAT SPLASH SLEEPFUL NIGHT"
-    }
-    
-    if pd.isna(producto):
-        return np.nan
-    producto = producto.upper().strip()
-    for key, value in replacements.items():
-        producto = re.sub(rf"\b{re.escape(key)}\b", value, producto)
-    producto = re.sub(r"\s+", " ", producto)
-    return producto
+        pd.Series: Productos normalizados, sin errores comunes ni variaciones innecesarias.
+    """
+    producto = producto.str.upper().str.strip()
+    producto = producto.str.replace(RE_PRODUCTO_REEMPLAZOS, lambda m: PRODUCTO_REEMPLAZOS[m.group(1)], regex=True)
+    return producto.str.replace(RE_ESPACIOS, " ", regex=True)
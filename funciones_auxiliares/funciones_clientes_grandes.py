@@ -15,7 +15,9 @@ Funcionalidades principales:
 """
 
 import pandas as pd
+import numpy as np
 from datetime import datetime
+from funciones_auxiliares.funciones import convertir_fechas
 
 meses_mapping = {
     "ENE": "1", "FEB": "2", "MAR": "3", "ABR": "4",
@@ -23,17 +25,69 @@ meses_mapping = {
     "SEP": "9", "OCT": "10", "NOV": "11", "DIC": "12"
 }
 
+meses_num = {mes: int(numero) for mes, numero in meses_mapping.items()}
+
+numero_a_mes = {numero: mes for mes, numero in meses_num.items()}
+
+meses_categoria = pd.CategoricalDtype(list(meses_mapping), ordered=True)
+
 meses_makro = {
     "ENE": "Enero", "FEB": "Febrero", "MAR": "Marzo", "ABR": "Abril",
     "MAY": "Mayo", "JUN": "Junio", "JUL": "Julio", "AGO": "Agosto",
     "SEP": "Septiembre", "OCT": "Octubre", "NOV": "Noviembre", "DIC": "Diciembre"
 }
 
+# Nombres completos de mes que aparecen en consolidados anteriores: en inglés (formato
+# antiguo de PROMOTORA, p. ej. "march") y en español
+meses_legados = {
+    **dict(zip(
+        ("JANUARY", "FEBRUARY", "MARCH", "APRIL", "MAY", "JUNE",
+         "JULY", "AUGUST", "SEPTEMBER", "OCTOBER", "NOVEMBER", "DECEMBER"),
+        meses_mapping
+    )),
+    **{nombre.upper(): mes for mes, nombre in meses_makro.items()}
+}
+
+tiendas_especiales_promotora = {
+    "CARULLA PRADERA DE POTOSI": ("CARULLA PRADERA DE POTOSI", "POTOSI"),
+    "CARULLA MANIZALES": ("CARULLA MANIZALES", "MANIZALES"),
+    "CARULLA PLAZA CLARO": ("CARULLA PLAZA CLARO", "BOGOTA")
+}
+
+tiendas_especiales_makro = {
+    "MAKRO CALLE 30": ("MAKRO CALLE 30", "SOLEDAD"),
+    "ESTACION POBLADO": ("ESTACION POBLADO", "MEDELLIN"),
+    "CALI - NORTE": ("NORTE", "CALI")
+}
+
+def normalizar_meses(meses):
+    """
+    Convierte la columna `Mes` de un consolidado al tipo categórico ENE..DIC.
+    
+    Recorta espacios, pasa a mayúsculas y traduce los nombres completos heredados
+    (`meses_legados`) antes de convertir, de modo que ninguna etiqueta válida se
+    pierda como NaN. Si quedan etiquetas que no corresponden a ningún mes se lanza
+    ValueError en lugar de reescribir el consolidado con meses vacíos.
+    """
+
+    if meses.dtype == meses_categoria:
+        return meses
+
+    etiquetas = meses.astype(object).where(meses.notna())
+    etiquetas = etiquetas.str.strip().str.upper()
+    etiquetas = etiquetas.mask(etiquetas.isin(meses_legados), etiquetas.map(meses_legados))
+    desconocidas = etiquetas.notna() & ~etiquetas.isin(meses_categoria.categories)
+    if desconocidas.any():
+        raise ValueError(
+            f"Etiquetas de mes no reconocidas en el consolidado: {sorted(etiquetas[desconocidas].unique())}"
+        )
+    return etiquetas.astype(meses_categoria)
+
 def obtener_numero_mes(nombre_mes):
     """
     Convierte el nombre abreviado de un mes a su número correspondiente.
     """
-    return int(meses_mapping[nombre_mes])
+    return meses_num[nombre_mes]
     
 def obtener_siguiente_mes(mes_actual, año_actual):
     """
@@ -41,87 +95,116 @@ def obtener_siguiente_mes(mes_actual, año_actual):
     Maneja automáticamente el cambio de año cuando el mes actual es diciembre.
     """
 
-    numero_a_mes = {
-        1: "ENE", 2: "FEB", 3: "MAR", 4: "ABR",
-        5: "MAY", 6: "JUN", 7: "JUL", 8: "AGO",
-        9: "SEP", 10: "OCT", 11: "NOV", 12: "DIC"
-    }
-    
-    num_mes_actual = int(meses_mapping[mes_actual])
-    
-    if num_mes_actual == 12:
-        siguiente_mes_num = 1
-        siguiente_año = año_actual + 1
-    else:
-        siguiente_mes_num = num_mes_actual + 1
-        siguiente_año = año_actual
-    
-    siguiente_mes = numero_a_mes[siguiente_mes_num]
-    
-    return siguiente_mes, siguiente_año
+    cambio_año, indice_siguiente = divmod(meses_num[mes_actual], 12)
+    return numero_a_mes[indice_siguiente + 1], año_actual + cambio_año
 
-def obtener_ultimo_mes_cliente(consolidado_sell_out, nombre_cliente):
+def calcular_ultimos_meses(consolidado_sell_out):
     """
-    Obtiene información del último mes registrado para un cliente específico.
+    Calcula en una sola pasada el último mes registrado para cada cliente del consolidado.
     
-    Busca en el consolidado de ventas el registro más reciente de un cliente
-    y calcula automáticamente cuál sería el siguiente mes a procesar.
-    """ 
+    Construye una clave numérica año*100 + mes, con el mes tomado de los códigos
+    de la columna categórica `Mes` (ENE..DIC), y toma, sin ordenar, el registro
+    con la clave máxima de cada cliente, calculando además cuál sería el
+    siguiente mes a procesar.
+    El resultado se guarda en `datos['ultimos_meses']` al cargar los datos.
+    """
 
-    try:
-        
-        df_cliente = consolidado_sell_out[consolidado_sell_out['cliente'] == nombre_cliente].copy()
-        
-        if df_cliente.empty:
-            return {"error": f"No se encontraron registros para el cliente: {nombre_cliente}"}
-        
-        df_cliente['fecha_ordenamiento'] = pd.to_datetime(
-            df_cliente['año'].astype(str) + '-' + 
-            df_cliente['Mes'].map(meses_mapping) + '-01'
-        )
-        
-        df_cliente_ordenado = df_cliente.sort_values('fecha_ordenamiento')
-        ultimo_registro = df_cliente_ordenado.iloc[-1]
-        
-        return {
+    if consolidado_sell_out is None:
+        raise ValueError("No se cargó el consolidado de Sell Out")
+    faltantes = {'cliente', 'Mes', 'año', 'Unidades'}.difference(consolidado_sell_out.columns)
+    if faltantes:
+        raise ValueError(f"Al consolidado de Sell Out le faltan las columnas: {sorted(faltantes)}")
+
+    meses = normalizar_meses(consolidado_sell_out['Mes'])
+
+    clave_fecha = pd.Series(
+        consolidado_sell_out['año'].to_numpy() * 100 +
+        meses.cat.codes.to_numpy() + 1,
+        index=consolidado_sell_out.index
+    )
+
+    agrupado = clave_fecha.groupby(consolidado_sell_out['cliente'].to_numpy(), sort=False)
+    indices_ultimos = agrupado.idxmax()
+    total_registros = agrupado.size()
+    ultimos_registros = consolidado_sell_out.loc[indices_ultimos, ['cliente', 'Mes', 'año', 'Unidades']]
+
+    ultimos_meses = {}
+    for ultimo_registro in ultimos_registros.to_dict('records'):
+        ultimos_meses[ultimo_registro['cliente']] = {
             "cliente": ultimo_registro['cliente'],
             "ultimo_mes": ultimo_registro['Mes'],
             "ultimo_año": ultimo_registro['año'],
             "fecha_completa": f"{ultimo_registro['Mes']} {ultimo_registro['año']}",
             "unidades": ultimo_registro['Unidades'],
-            "total_registros": len(df_cliente),
-            "siguiente_mes": obtener_siguiente_mes( ultimo_registro['Mes'], ultimo_registro['año'])
+            "total_registros": int(total_registros[ultimo_registro['cliente']]),
+            "siguiente_mes": obtener_siguiente_mes(ultimo_registro['Mes'], ultimo_registro['año'])
         }
-        
-    except FileNotFoundError:
-        return {"error": "Archivo no encontrado"}
-    except Exception as e:
-        return {"error": f"Error al procesar el archivo: {str(e)}"}
 
-def separar_tienda_ciudad(nombre):
+    return ultimos_meses
+
+def obtener_ultimo_mes_cliente(ultimos_meses, nombre_cliente):
     """
-    Separa el nombre de una tienda de su ciudad basándose en patrones específicos.
+    Obtiene información del último mes registrado para un cliente específico.
     
-    Aplica reglas específicas para nombres de tiendas conocidos y usa patrones
-    generales para casos no específicos.
+    Consulta el resultado precalculado por `calcular_ultimos_meses`, que incluye
+    el siguiente mes a procesar para el cliente.
+    """ 
+
+    if nombre_cliente not in ultimos_meses:
+        return {"error": f"No se encontraron registros para el cliente: {nombre_cliente}"}
+    return ultimos_meses[nombre_cliente]
+
+def convertir_a_categorias(df, columnas):
     """
+    Convierte las columnas indicadas a tipo category antes de agrupar.
 
-    nombre = nombre.strip()
-    
-    if nombre == "CARULLA PRADERA DE POTOSI":
-        return "CARULLA PRADERA DE POTOSI", "POTOSI"
-    elif nombre == "CARULLA MANIZALES":
-        return "CARULLA MANIZALES", "MANIZALES"
-    elif nombre == "CARULLA PLAZA CLARO":
-        return "CARULLA PLAZA CLARO", "BOGOTA"
-    
-    if '-' in nombre:
-        partes = [x.strip() for x in nombre.split('-')]
-        tienda = partes[0]
-        ciudad = partes[1]
-        return tienda, ciudad
+    La agrupación sobre categorías trabaja con códigos enteros en lugar de
+    cadenas de texto, lo que reduce el tiempo y la memoria del groupby.
+    """
+
+    for columna in columnas:
+        df[columna] = df[columna].astype("category")
+    return df
+
+def reducir_enteros(df):
+    """
+    Reduce a int32 las columnas enteras cuyos valores caben en ese rango.
+
+    Las agregaciones y agrupaciones recorren la mitad de bytes. Las columnas
+    con valores fuera de rango (como los EAN) se mantienen en int64 y los
+    flotantes no se modifican para no perder precisión.
+    """
+
+    limites = np.iinfo(np.int32)
+    for columna in df.select_dtypes("integer").columns:
+        valores = df[columna]
+        if valores.empty or (valores.min() >= limites.min and valores.max() <= limites.max):
+            df[columna] = valores.astype(np.int32)
+    return df
+
+def separar_tienda_ciudad(nombres):
+    """
+    Separa el nombre de cada tienda de su ciudad basándose en patrones específicos.
     
-    return nombre, "CIUDAD DESCONOCIDA"
+    Aplica reglas específicas para nombres de tiendas conocidos y usa patrones
+    generales para casos no específicos. Opera sobre la columna completa.
+    """
+
+    nombres = nombres.str.strip()
+    tiene_guion = nombres.str.contains("-", regex=False, na=False)
+    partes = nombres.str.split("-", n=2)
+
+    tienda = partes.str[0].str.strip().where(tiene_guion, nombres)
+    ciudad = partes.str[1].str.strip().where(tiene_guion, "CIUDAD DESCONOCIDA")
+
+    # Una sola búsqueda en el diccionario resuelve todos los casos especiales.
+    especiales = nombres.map(tiendas_especiales_promotora)
+    es_especial = especiales.notna()
+    if es_especial.any():
+        tienda = tienda.mask(es_especial, especiales.str[0])
+        ciudad = ciudad.mask(es_especial, especiales.str[1])
+
+    return pd.DataFrame({"Tienda": tienda, "Ciudad": ciudad})
     
 def obtener_mes_completo(nombre_mes):
     """
@@ -129,35 +212,30 @@ def obtener_mes_completo(nombre_mes):
     """
     return meses_makro[nombre_mes]
 
-def separar_tienda_ciudad_makro(valor):
+def separar_tienda_ciudad_makro(valores):
     """
     Separa tienda y ciudad específicamente para datos de MAKRO.
     
     Aplica reglas específicas para el formato de nombres de tiendas de MAKRO,
-    que pueden incluir códigos y formatos particulares.
+    que pueden incluir códigos y formatos particulares. Opera sobre la columna completa.
     """
 
-    if pd.isna(valor):
-        return pd.Series(["", ""])
-    
-    partes = valor.split("-", 1)
-    nombre = partes[1].strip() if len(partes) == 2 else valor.strip()
-    nombre = nombre.upper()
-
-    if nombre == "MAKRO CALLE 30":
-        return pd.Series(["MAKRO CALLE 30", "SOLEDAD"])
-    elif nombre == "ESTACION POBLADO":
-        return pd.Series(["ESTACION POBLADO", "MEDELLIN"])
-    elif nombre == "CALI - NORTE":
-        return pd.Series(["NORTE", "CALI"])
-    
-    if " - " in nombre:
-        partes = nombre.rsplit(" - ", 1)
-        if len(partes) == 2:
-            tienda, ciudad = partes
-            return pd.Series([tienda.strip(), ciudad.strip()])
+    partes = valores.str.split("-", n=1)
+    nombres = partes.str[1].where(partes.str.len().eq(2), valores).str.strip().str.upper()
+
+    partes_ciudad = nombres.str.rsplit(" - ", n=1)
+    tiene_ciudad = partes_ciudad.str.len().eq(2)
+    tienda = partes_ciudad.str[0].str.strip().where(tiene_ciudad, "Tienda Única")
+    ciudad = partes_ciudad.str[1].str.strip().where(tiene_ciudad, nombres)
 
-    return pd.Series(["Tienda Única", nombre.strip()])
+    especiales = nombres.map(tiendas_especiales_makro)
+    es_especial = especiales.notna()
+    if es_especial.any():
+        tienda = tienda.mask(es_especial, especiales.str[0])
+        ciudad = ciudad.mask(es_especial, especiales.str[1])
+
+    es_nulo = valores.isna()
+    return pd.DataFrame({"Tienda": tienda.mask(es_nulo, ""), "Ciudad": ciudad.mask(es_nulo, "")})
 
 ## PROCESAMIENTO CLIENTE - PROMOTORA
 def procesar_promotora(datos):
@@ -172,7 +250,7 @@ def procesar_promotora(datos):
     Args:
         datos (Dict[str, pd.DataFrame]): Diccionario con DataFrames necesarios:
             - 'tabla_cliente_promotora': Datos de ventas de PROMOTORA
-            - 'tabla_sell_out_consolidado': Historial consolidado de ventas
+            - 'ultimos_meses': Último mes registrado por cliente en el consolidado
             
     Returns:
         Tuple[Optional[Dict], Optional[pd.DataFrame]]: Tupla con:
@@ -186,14 +264,14 @@ def procesar_promotora(datos):
     if datos.get('tabla_cliente_promotora') is None:
         return None, None
     
-    informacion_consolidado= obtener_ultimo_mes_cliente(datos['tabla_sell_out_consolidado'], "PROMOTORA DE COMERCIO SOCIAL")
+    informacion_consolidado= obtener_ultimo_mes_cliente(datos['ultimos_meses'], "PROMOTORA DE COMERCIO SOCIAL")
     archivo_entrada_promotora = datos['tabla_cliente_promotora']
     
     if 'Unidades' not in archivo_entrada_promotora.columns:
         return {"error": "No se encontró la columna 'Unidades' en el archivo de promotora"}
 
-    archivo_entrada_promotora["Fecha"] = pd.to_datetime(archivo_entrada_promotora["Fecha"], errors='coerce')
-    archivo_entrada_promotora["Mes"] = archivo_entrada_promotora["Fecha"].dt.strftime("%B").str.lower()
+    archivo_entrada_promotora["Fecha"] = convertir_fechas(archivo_entrada_promotora["Fecha"])
+    archivo_entrada_promotora["Mes"] = archivo_entrada_promotora["Fecha"].dt.month.map(numero_a_mes)
     archivo_entrada_promotora["Año"] = archivo_entrada_promotora["Fecha"].dt.year
 
     archivo_entrada_promotora = archivo_entrada_promotora[
@@ -202,24 +280,21 @@ def procesar_promotora(datos):
     ]
     
         
-    archivo_entrada_promotora[['Tienda', 'Ciudad']] = archivo_entrada_promotora['Nomb. Dependencia'].apply(
-    lambda x: pd.Series(separar_tienda_ciudad(x))
-    )
+    archivo_entrada_promotora[['Tienda', 'Ciudad']] = separar_tienda_ciudad(archivo_entrada_promotora['Nomb. Dependencia'])
 
     siguiente_mes, siguiente_año = informacion_consolidado['siguiente_mes']
     num_mes = obtener_numero_mes(siguiente_mes)
 
+    archivo_entrada_promotora = convertir_a_categorias(
+        archivo_entrada_promotora, ["EAN", "Mes", "Tienda", "Ciudad", "Descripción"]
+    )
     ventas_promotora = archivo_entrada_promotora.groupby([
-       "EAN", "Mes", "Año", "Tienda", "Ciudad", "Descripción" ]).agg({"Unidades": "sum"}).reset_index()
+       "EAN", "Mes", "Año", "Tienda", "Ciudad", "Descripción" ], sort=False, observed=True, as_index=False).agg(Unidades=("Unidades", "sum"))
 
     ventas_promotora = ventas_promotora.rename(columns={"Año": "año", "Descripción":"Descripcion"})
-
-    pos_ean = ventas_promotora.columns.get_loc("EAN")
-    ventas_promotora.insert(pos_ean + 1, "cliente", "PROMOTORA DE COMERCIO SOCIAL")
-    
-
-    pos = ventas_promotora.columns.get_loc("Unidades")
-    ventas_promotora.insert(pos + 1, "NumMes", num_mes)
+    ventas_promotora = ventas_promotora.assign(cliente="PROMOTORA DE COMERCIO SOCIAL", NumMes=num_mes)[[
+        "EAN", "cliente", "Mes", "año", "Tienda", "Ciudad", "Descripcion", "Unidades", "NumMes"
+    ]]
 
     total_unidades = int(ventas_promotora["Unidades"].sum())
 
@@ -240,12 +315,14 @@ def procesar_makro(datos):
     Procesa los datos de ventas específicos de MAKRO SUPERMAYORISTA SAS.
     
     Transforma los datos de MAKRO que vienen en formato de columnas múltiples
-    (MultiIndex) en un formato estandarizado para análisis de sell-out.
+    (MultiIndex) en un formato estandarizado para análisis de sell-out. Las
+    columnas se aplanan al inicio: los niveles "Unnamed" se descartan y el resto
+    queda como "<nivel_0>__<nivel_1>" (por ejemplo "Abril__Cde.").
     
     Args:
         datos (Dict[str, pd.DataFrame]): Diccionario con DataFrames necesarios:
             - 'tabla_cliente_makro': Datos de ventas de MAKRO (formato MultiIndex)
-            - 'tabla_sell_out_consolidado': Historial consolidado de ventas
+            - 'ultimos_meses': Último mes registrado por cliente en el consolidado
             
     Returns:
         Tuple[Optional[Dict], Optional[pd.DataFrame]]: Tupla con:
@@ -259,70 +336,62 @@ def procesar_makro(datos):
         return None, None
 
     archivo_entrada_makro = datos['tabla_cliente_makro']
-    informacion_consolidado= obtener_ultimo_mes_cliente(datos['tabla_sell_out_consolidado'], "MAKRO SUPERMAYORISTA SAS")
+    informacion_consolidado= obtener_ultimo_mes_cliente(datos['ultimos_meses'], "MAKRO SUPERMAYORISTA SAS")
     siguiente_mes, siguiente_año = informacion_consolidado['siguiente_mes']
 
     mes_procesar = obtener_mes_completo(siguiente_mes)
     
-    id_vars = [
-        ('Tienda', 'Unnamed: 6_level_1'),
-        ('Número de artículo Makro', 'Unnamed: 2_level_1'),
-        ('Descripción del artículo', 'Unnamed: 1_level_1'),
-        ('Codigo de barras', 'Unnamed: 5_level_1')
+    id_vars = ['Tienda', 'Número de artículo Makro', 'Descripción del artículo', 'Codigo de barras']
+
+    columnas_planas = [
+        nivel_0 if "Unnamed" in str(nivel_1) else f"{nivel_0}__{nivel_1}"
+        for nivel_0, nivel_1 in archivo_entrada_makro.columns
     ]
+    df_completo = archivo_entrada_makro.set_axis(columnas_planas, axis=1)
 
-    df_completo = archivo_entrada_makro.copy()
+    filas_validas = np.ones(len(df_completo), dtype=bool)
     for col in id_vars:
         if col in df_completo.columns:
-            df_completo = df_completo[
-                df_completo[col].notna() & 
-                (df_completo[col] != '') & 
-                (df_completo[col] != ' ')
-            ]
+            valores = df_completo[col]
+            filas_validas &= (valores.notna() & (valores != '') & (valores != ' ')).to_numpy()
+    df_completo = df_completo[filas_validas]
 
-    columna_mes_cde = [col for col in df_completo.columns if col == (mes_procesar, 'Cde.')]
-        
-    MAKRO_consolidado_long = df_completo.melt(
-        id_vars=id_vars, 
-        value_vars=columna_mes_cde,
-        var_name="Mes", 
-        value_name="Unidades"
-    )
+    columna_mes_cde = f"{mes_procesar}__Cde."
+    if columna_mes_cde in df_completo.columns:
+        unidades_mes = df_completo[columna_mes_cde]
+    else:
+        unidades_mes = pd.Series(np.nan, index=df_completo.index)
 
-    MAKRO_consolidado_long = MAKRO_consolidado_long.dropna(subset=['Unidades'])
-    MAKRO_consolidado_long = MAKRO_consolidado_long[MAKRO_consolidado_long['Unidades'] != 0]
-    
-    MAKRO_consolidado_long["Mes"] = (MAKRO_consolidado_long["Mes"]
-                                   .str.replace("Cde.", "")
-                                   .str.lower())
+    filas_con_ventas = unidades_mes.notna() & (unidades_mes != 0)
+
+    MAKRO_consolidado_long = df_completo.loc[filas_con_ventas, id_vars]
+    MAKRO_consolidado_long["Mes"] = mes_procesar.lower()
+    MAKRO_consolidado_long["Unidades"] = unidades_mes[filas_con_ventas].to_numpy()
 
     MAKRO_consolidado_long["Año"] = siguiente_año
     MAKRO_consolidado_long["cliente"] = "MAKRO SUPERMAYORISTA SAS"
     
 
-    col_tienda_raw = ('Tienda', 'Unnamed: 6_level_1')
-
-    MAKRO_consolidado_long[['Tienda', 'Ciudad']] = MAKRO_consolidado_long[col_tienda_raw].apply(
-        separar_tienda_ciudad_makro
-    )
+    MAKRO_consolidado_long[['Tienda', 'Ciudad']] = separar_tienda_ciudad_makro(MAKRO_consolidado_long['Tienda'])
 
+    MAKRO_consolidado_long = convertir_a_categorias(MAKRO_consolidado_long, [
+        'Codigo de barras', "Mes", "Tienda", "Ciudad", 'Descripción del artículo'
+    ])
     Venta_Unidades_MAKRO = MAKRO_consolidado_long.groupby([
-        ('Codigo de barras', 'Unnamed: 5_level_1'), "Mes", "Año", "cliente", "Tienda", "Ciudad", ('Descripción del artículo', 'Unnamed: 1_level_1')
-    ]).agg({"Unidades": "sum"}).reset_index()
+        'Codigo de barras', "Mes", "Año", "cliente", "Tienda", "Ciudad", 'Descripción del artículo'
+    ], sort=False, observed=True, as_index=False).agg(Unidades=("Unidades", "sum"))
 
     total_unidades = int(MAKRO_consolidado_long["Unidades"].sum())
     num_mes = obtener_numero_mes(siguiente_mes)
 
-    Venta_Unidades_MAKRO = Venta_Unidades_MAKRO.rename(columns={"Año": "año", ('Codigo de barras', 'Unnamed: 5_level_1'):"EAN", ('Descripción del artículo', 'Unnamed: 1_level_1'):"Descripcion"})
-
-    pos = Venta_Unidades_MAKRO.columns.get_loc("Unidades")
-    Venta_Unidades_MAKRO.insert(pos + 1, "NumMes", num_mes)
+    Venta_Unidades_MAKRO = Venta_Unidades_MAKRO.rename(columns={"Año": "año", 'Codigo de barras':"EAN", 'Descripción del artículo':"Descripcion"})
+    Venta_Unidades_MAKRO["NumMes"] = num_mes
 
     consolidado_sell_out = {
         "Mes": siguiente_mes,
         "año": siguiente_año,
         "cliente": "MAKRO SUPERMAYORISTA SAS",
-        "Unidades": int(MAKRO_consolidado_long["Unidades"].sum()),
+        "Unidades": total_unidades,
         "NumMes": num_mes
     }
     
@@ -340,7 +409,7 @@ def procesar_farmatodo(datos):
     Args:
         datos (Dict[str, pd.DataFrame]): Diccionario con DataFrames necesarios:
             - 'tabla_cliente_farmatodo': Datos de ventas de FARMATODO
-            - 'tabla_sell_out_consolidado': Historial consolidado de ventas
+            - 'ultimos_meses': Último mes registrado por cliente en el consolidado
             
     Returns:
         Tuple[Optional[Dict], Optional[pd.DataFrame]]: Tupla con:
@@ -354,7 +423,7 @@ def procesar_farmatodo(datos):
         return None, None
 
     archivo_farmatodo = datos['tabla_cliente_farmatodo']
-    informacion_consolidado= obtener_ultimo_mes_cliente(datos['tabla_sell_out_consolidado'], "FARMATODO COLOMBIA SA")
+    informacion_consolidado= obtener_ultimo_mes_cliente(datos['ultimos_meses'], "FARMATODO COLOMBIA SA")
     siguiente_mes, siguiente_año = informacion_consolidado['siguiente_mes']
     num_mes = obtener_numero_mes(siguiente_mes)
 
@@ -371,12 +440,13 @@ def procesar_farmatodo(datos):
     farmatodo_tabla["año"] = siguiente_año
     farmatodo_tabla["cliente"] = "FARMATODO COLOMBIA SA"
 
+    farmatodo_tabla = reducir_enteros(farmatodo_tabla)
+    farmatodo_tabla = convertir_a_categorias(farmatodo_tabla, ["EAN", "Mes", "Tienda", "Ciudad", "Descripcion"])
     farmatodo_tabla = farmatodo_tabla.groupby([
         "EAN", "Mes", "año", "cliente", "Tienda", "Ciudad", "Descripcion"
-    ]).agg({"Unidades": "sum"}).reset_index()
+    ], sort=False, observed=True, as_index=False).agg(Unidades=("Unidades", "sum"))
 
-    pos = farmatodo_tabla.columns.get_loc("Unidades")
-    farmatodo_tabla.insert(pos + 1, "NumMes", num_mes)
+    farmatodo_tabla["NumMes"] = num_mes
 
     consolidado_sell_out = {
         "Mes": siguiente_mes,
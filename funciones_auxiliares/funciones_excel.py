@@ -0,0 +1,198 @@
+"""
+Módulo para escritura rápida de archivos Excel.
+
+Escribe los DataFrames directamente con xlsxwriter, fila por fila y en modo
+de memoria constante, sin pasar por el formateador celda a celda de
+`DataFrame.to_excel`. Está pensado para las tablas consolidadas, que pueden
+tener decenas o cientos de miles de filas.
+
+Los consolidados también pueden guardarse y leerse en Parquet, que evita el
+costo de serializar y volver a interpretar el XML de Excel en cada ejecución.
+Las lecturas de Excel se guardan además en una caché binaria local, de modo
+que un archivo que no ha cambiado no se vuelve a interpretar, y las lecturas
+independientes pueden ejecutarse en paralelo.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import xlsxwriter
+
+from funciones_auxiliares.config import RUTAS
+
+RUTA_CACHE = os.path.join(RUTAS['SALIDA'], '.cache')
+
+def guardar_excel(df, ruta_salida, hoja="Sheet1"):
+    """
+    Guarda un DataFrame en un archivo Excel escribiendo las filas en streaming con xlsxwriter.
+
+    Las fechas se escriben como fechas de Excel y los valores nulos (NaN, NaT, None)
+    como celdas vacías, igual que `DataFrame.to_excel(index=False)`.
+
+    Parámetros:
+        df (pd.DataFrame): Tabla a guardar.
+        ruta_salida (str): Ruta completa del archivo .xlsx de salida.
+        hoja (str): Nombre de la hoja de cálculo.
+    """
+    workbook = xlsxwriter.Workbook(ruta_salida, {
+        "constant_memory": True,
+        "strings_to_urls": False,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss"
+    })
+    try:
+        worksheet = workbook.add_worksheet(hoja)
+        formato_encabezado = workbook.add_format({
+            "bold": True, "border": 1, "align": "center", "valign": "top"
+        })
+        worksheet.write_row(0, 0, list(df.columns), formato_encabezado)
+
+        valores = df.astype(object).where(df.notna(), None)
+        for i, fila in enumerate(valores.itertuples(index=False, name=None), start=1):
+            worksheet.write_row(i, 0, fila)
+    finally:
+        workbook.close()
+
+def ruta_parquet_consolidado(ruta_excel):
+    """
+    Devuelve la ruta en la que `guardar_consolidado` escribe la versión Parquet de un
+    consolidado: la carpeta de salida, con el mismo nombre del .xlsx.
+
+    Parámetros:
+        ruta_excel (str): Ruta del archivo .xlsx del consolidado (en cualquier carpeta).
+
+    Returns:
+        str: Ruta del archivo .parquet en `RUTAS['SALIDA']`.
+    """
+    nombre = os.path.splitext(os.path.basename(ruta_excel))[0] + ".parquet"
+    return os.path.join(RUTAS['SALIDA'], nombre)
+
+def guardar_consolidado(df, ruta_salida, formato="excel"):
+    """
+    Guarda un consolidado en el formato indicado.
+
+    Con formato "parquet" se escribe un archivo .parquet junto a la ruta .xlsx
+    indicada (requiere pyarrow); con "excel" se usa `guardar_excel`.
+
+    Parámetros:
+        df (pd.DataFrame): Tabla a guardar.
+        ruta_salida (str): Ruta del archivo .xlsx de salida.
+        formato (str): "excel" o "parquet".
+
+    Returns:
+        str: Ruta del archivo efectivamente escrito.
+    """
+    if formato == "parquet":
+        ruta_parquet = os.path.splitext(ruta_salida)[0] + ".parquet"
+        df.to_parquet(ruta_parquet, index=False)
+        return ruta_parquet
+    if formato != "excel":
+        raise ValueError(f"Formato de consolidado no soportado: {formato}")
+
+    guardar_excel(df, ruta_salida)
+    return ruta_salida
+
+def leer_consolidado(ruta_excel, formato="excel", **opciones):
+    """
+    Lee un consolidado, usando su versión Parquet solo si está vigente.
+
+    Con formato "parquet" se buscan dos copias Parquet: la que está junto al .xlsx
+    (si se movió a la carpeta de consolidados) y la que escribió `guardar_consolidado`
+    en la carpeta de salida. Se usa la más reciente, siempre que no sea más antigua
+    que el .xlsx; así, si el Excel se editó o reemplazó después, se lee el Excel.
+    Con formato "excel" siempre se lee el .xlsx.
+
+    Parámetros:
+        ruta_excel (str): Ruta del archivo .xlsx del consolidado.
+        formato (str): "excel" o "parquet", normalmente `config['formato_consolidados']`.
+        **opciones: Argumentos adicionales para `pd.read_excel`.
+
+    Returns:
+        pd.DataFrame: Consolidado leído.
+    """
+    if formato == "parquet":
+        mtime_excel = os.stat(ruta_excel).st_mtime_ns if os.path.exists(ruta_excel) else None
+        candidatos = [
+            (os.stat(ruta).st_mtime_ns, ruta)
+            for ruta in {os.path.splitext(ruta_excel)[0] + ".parquet", ruta_parquet_consolidado(ruta_excel)}
+            if os.path.exists(ruta)
+        ]
+        if candidatos:
+            mtime_parquet, ruta_parquet = max(candidatos)
+            if mtime_excel is None or mtime_parquet >= mtime_excel:
+                return pd.read_parquet(ruta_parquet)
+    return leer_excel_cacheado(ruta_excel, **opciones)
+
+def leer_excel_cacheado(ruta_excel, estado=None, **opciones):
+    """
+    Lee un archivo Excel reutilizando una copia en caché si el archivo no ha cambiado.
+
+    El nombre de la copia combina una parte fija por archivo (ruta y opciones de lectura;
+    las funciones, como un `usecols` invocable, se identifican por su nombre completo) y
+    una parte por versión (fecha de modificación y tamaño). Si no hay copia válida, se lee
+    el Excel, se guarda el resultado en `RUTA_CACHE` de forma atómica y se borran las
+    copias de versiones anteriores del mismo archivo, de modo que la caché no crece con
+    cada cambio de los archivos de entrada. La caché puede vaciarse en cualquier momento
+    borrando la carpeta `RUTA_CACHE` (`salida/.cache`); se reconstruye en la siguiente lectura.
+
+    Parámetros:
+        ruta_excel (str): Ruta del archivo .xlsx.
+        estado (os.stat_result, opcional): Resultado de `os.stat` ya obtenido para el archivo,
+            para no volver a consultarlo.
+        **opciones: Argumentos adicionales para `pd.read_excel`.
+
+    Returns:
+        pd.DataFrame: Tabla leída.
+    """
+    if estado is None:
+        estado = os.stat(ruta_excel)
+    opciones_firma = sorted(
+        (clave, f"{valor.__module__}.{valor.__qualname__}" if callable(valor) else valor)
+        for clave, valor in opciones.items()
+    )
+    firma_archivo = f"{os.path.abspath(ruta_excel)}|{opciones_firma!r}"
+    prefijo = hashlib.blake2b(firma_archivo.encode("utf-8"), digest_size=12).hexdigest()
+    version = hashlib.blake2b(f"{estado.st_mtime_ns}|{estado.st_size}".encode("utf-8"), digest_size=8).hexdigest()
+    nombre_cache = f"{prefijo}_{version}.pkl"
+    ruta_cache = os.path.join(RUTA_CACHE, nombre_cache)
+
+    if os.path.exists(ruta_cache):
+        return pd.read_pickle(ruta_cache)
+
+    df = pd.read_excel(ruta_excel, **opciones)
+
+    os.makedirs(RUTA_CACHE, exist_ok=True)
+    ruta_temporal = f"{ruta_cache}.{os.getpid()}.tmp"
+    df.to_pickle(ruta_temporal)
+    os.replace(ruta_temporal, ruta_cache)
+
+    # Las copias de versiones anteriores del mismo archivo ya no se pueden volver a usar
+    for entrada in os.scandir(RUTA_CACHE):
+        if entrada.name.startswith(f"{prefijo}_") and entrada.name.endswith(".pkl") and entrada.name != nombre_cache:
+            try:
+                os.remove(entrada.path)
+            except FileNotFoundError:
+                pass
+    return df
+
+def leer_excels_en_paralelo(lecturas, max_hilos=8):
+    """
+    Ejecuta varias lecturas independientes de archivos en hilos paralelos.
+
+    Parámetros:
+        lecturas (dict): {clave: (lector, ruta, opciones)}, donde `lector` es la función
+            de lectura (por ejemplo `leer_excel_cacheado`) y `opciones` sus argumentos.
+        max_hilos (int): Número máximo de hilos a utilizar.
+
+    Returns:
+        dict: {clave: resultado de la lectura}. Si alguna lectura falla, se relanza su excepción.
+    """
+    if not lecturas:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(max_hilos, len(lecturas))) as executor:
+        futuros = {
+            clave: executor.submit(lector, ruta, **opciones)
+            for clave, (lector, ruta, opciones) in lecturas.items()
+        }
+        return {clave: futuro.result() for clave, futuro in futuros.items()}
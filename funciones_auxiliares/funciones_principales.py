@@ -1,14 +1,45 @@
 import pandas as pd
-import numpy as np
 import os
+import re
+from functools import lru_cache
 import funciones_auxiliares.funciones as funciones
 import logging
+from funciones_auxiliares.funciones_excel import leer_consolidado, leer_excel_cacheado, leer_excels_en_paralelo
+from funciones_auxiliares.funciones_clientes_grandes import calcular_ultimos_meses, obtener_ultimo_mes_cliente, reducir_enteros, normalizar_meses
 
 # Importar configuración
 from funciones_auxiliares.config import (
-    RUTAS, ARCHIVOS_ENTRADA, ARCHIVOS_CONSOLIDADOS, ARCHIVOS_SALIDA, FECHAS, obtener_ruta_completa, aplicar_configuracion_pandas
+    RUTAS, ARCHIVOS_ENTRADA, ARCHIVOS_CONSOLIDADOS, ARCHIVOS_SALIDA, FECHAS, MOTOR_EXCEL, FORMATO_CONSOLIDADOS, obtener_ruta_completa, aplicar_configuracion_pandas
 )
 
+RE_ESPACIOS = re.compile(r'\s+')
+RE_CARACTERES_NO_VALIDOS = re.compile(r'[^\w\s\.\-_]')
+VALORES_NULOS_EXCEL = ['nan', 'None', '', 'NaN']
+RE_SEPARADORES_NUMERICOS = re.compile(r'[ ,.]')
+# Cinco o más ceros finales agregados por Excel; se conservan los valores formados solo por ceros
+RE_CEROS_EXTRA = re.compile(r'^(.*[^0])0{5,}\Z', re.DOTALL)
+
+MESES_ABREVIADOS = ('ENE', 'FEB', 'MAR', 'ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC')
+POSICION_MES = {mes: posicion for posicion, mes in enumerate(MESES_ABREVIADOS)}
+# Columnas de la tabla de costos que usa `consolidar_costos_historicos` (con sus dos variantes de nombre)
+COLUMNAS_COSTOS_ENTRADA = frozenset({
+    'Marca', 'Referencia', 'Desc. item', 'Desc.item', 'Instalación', 'U.M.',
+    'Costo prom. uni.', 'Costo prom.', 'Mes', 'Año'
+})
+
+def es_columna_de_costos(columna):
+    """
+    Indica si una columna de la tabla de costos se usa en el procesamiento; se pasa como `usecols`
+    para no cargar el resto de columnas del archivo.
+
+    Parámetros:
+        columna (str): Nombre de la columna en el archivo.
+
+    Returns:
+        bool: True si la columna está en COLUMNAS_COSTOS_ENTRADA.
+    """
+    return columna in COLUMNAS_COSTOS_ENTRADA
+
 def configurar_rutas():
     """
     Configura las rutas y nombres de archivos necesarios para el procesamiento de datos a partir de la configuración global.
@@ -37,13 +68,15 @@ def configurar_rutas():
         'archivo_costos_consolidado': ARCHIVOS_CONSOLIDADOS.get('COSTOS_CONSOLIDADOS'),
         'tabla_familia_consolidado': ARCHIVOS_CONSOLIDADOS.get('FAMILIA'),
 
-        'ultima_fecha': FECHAS.get('ULTIMA_FECHA_CONSOLIDADO')
+        'ultima_fecha': FECHAS.get('ULTIMA_FECHA_CONSOLIDADO'),
+        'formato_consolidados': FORMATO_CONSOLIDADOS
     }
     
     aplicar_configuracion_pandas()
     return config
 
 
+@lru_cache(maxsize=256)
 def validar_formato_nombre_archivo(nombre_archivo, tipo_cliente):
     """
     Valida el formato MES_CLIENTE.xlsx del nombre de archivo
@@ -70,8 +103,7 @@ def validar_formato_nombre_archivo(nombre_archivo, tipo_cliente):
     mes_archivo = partes[0].upper()
     cliente_archivo = '_'.join(partes[1:]).upper()
     
-    meses_validos = ['ENE', 'FEB', 'MAR', 'ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC']
-    if mes_archivo not in meses_validos:
+    if mes_archivo not in POSICION_MES:
         return False, None, f"Mes '{mes_archivo}' no válido en {nombre_archivo}"
     
     if cliente_archivo != tipo_cliente.upper():
@@ -79,6 +111,7 @@ def validar_formato_nombre_archivo(nombre_archivo, tipo_cliente):
     
     return True, mes_archivo, None
 
+@lru_cache(maxsize=256)
 def verificar_mes_correcto(mes_archivo, mes_esperado, nombre_archivo):
     """
     Verifica si el mes extraído del nombre del archivo corresponde con el mes esperado según el consolidado.
@@ -93,20 +126,17 @@ def verificar_mes_correcto(mes_archivo, mes_esperado, nombre_archivo):
     if mes_archivo == mes_esperado:
         return True, f"✅ {nombre_archivo}: Mes correcto ({mes_esperado})"
     
-    meses_orden = ['ENE', 'FEB', 'MAR', 'ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC']
-    
-    try:
-        pos_archivo = meses_orden.index(mes_archivo)
-        pos_esperado = meses_orden.index(mes_esperado)
-        
-        if pos_archivo < pos_esperado or (pos_esperado == 0 and pos_archivo > 6):
-            return False, f"⚠️ {nombre_archivo}: Mes {mes_archivo} ya procesado (se esperaba {mes_esperado})"
-        else:
-            return False, f"⚠️ {nombre_archivo}: Mes {mes_archivo} no corresponde (se esperaba {mes_esperado})"
-    except ValueError:
+    pos_archivo = POSICION_MES.get(mes_archivo)
+    pos_esperado = POSICION_MES.get(mes_esperado)
+    if pos_archivo is None or pos_esperado is None:
         return False, f"❌ Error comparando meses en {nombre_archivo}"
+    
+    if pos_archivo < pos_esperado or (pos_esperado == 0 and pos_archivo > 6):
+        return False, f"⚠️ {nombre_archivo}: Mes {mes_archivo} ya procesado (se esperaba {mes_esperado})"
+    else:
+        return False, f"⚠️ {nombre_archivo}: Mes {mes_archivo} no corresponde (se esperaba {mes_esperado})"
 
-def validar_cliente_individual(config, datos, tipo_cliente, config_key, empresa_nombre):
+def validar_cliente_individual(config, datos, tipo_cliente, config_key, empresa_nombre, entradas=None):
     """
     Valida si un cliente grande tiene datos que pueden ser procesados en el mes actual.
 
@@ -116,16 +146,20 @@ def validar_cliente_individual(config, datos, tipo_cliente, config_key, empresa_
         tipo_cliente (str): Cliente a validar (ej. "MAKRO").
         config_key (str): Clave en config para obtener el archivo del cliente.
         empresa_nombre (str): Nombre como aparece en el consolidado.
+        entradas (dict, opcional): {nombre: os.DirEntry} de la carpeta de entrada, obtenido con
+            `os.scandir`, para no consultar el sistema de archivos por cada cliente.
 
     Returns:
-        dict: Diccionario con estado de procesamiento, mensajes y metadatos del archivo.
+        dict: Diccionario con estado de procesamiento, mensajes y metadatos del archivo
+        (incluye el resultado de `os.stat`, reutilizado como clave de la caché de lectura).
     """
     resultado = {
         'cliente': tipo_cliente,
         'procesable': False,
         'mensaje': '',
         'archivo': None,
-        'mes': None
+        'mes': None,
+        'estado_archivo': None
     }
     
     nombre_archivo = config.get(config_key)
@@ -138,7 +172,10 @@ def validar_cliente_individual(config, datos, tipo_cliente, config_key, empresa_
     ruta_datos = obtener_ruta_completa('entrada')
     ruta_completa = os.path.join(ruta_datos, nombre_archivo)
     
-    if not os.path.exists(ruta_completa):
+    entrada = (entradas or {}).get(nombre_archivo)
+    try:
+        resultado['estado_archivo'] = entrada.stat() if entrada is not None else os.stat(ruta_completa)
+    except OSError:
         resultado['mensaje'] = f"⚠️ {tipo_cliente}: Archivo no encontrado ({nombre_archivo})"
         return resultado
     
@@ -150,10 +187,7 @@ def validar_cliente_individual(config, datos, tipo_cliente, config_key, empresa_
     resultado['mes'] = mes_archivo
     
     try:
-
-        from funciones_auxiliares.funciones_clientes_grandes import obtener_ultimo_mes_cliente
-        
-        info_consolidado = obtener_ultimo_mes_cliente(datos['tabla_sell_out_consolidado'], empresa_nombre)
+        info_consolidado = obtener_ultimo_mes_cliente(datos['ultimos_meses'], empresa_nombre)
         if 'error' in info_consolidado:
             resultado['mensaje'] = f" {tipo_cliente}: Error en consolidado - {info_consolidado['error']}"
             return resultado
@@ -194,8 +228,15 @@ def validar_clientes_grandes_simple(config, datos):
     
     resultados = {}
     
+    # Un solo listado de la carpeta de entrada sirve para validar a todos los clientes.
+    try:
+        with os.scandir(obtener_ruta_completa('entrada')) as iterador:
+            entradas = {entrada.name: entrada for entrada in iterador}
+    except OSError:
+        entradas = {}
+    
     for tipo_cliente, (config_key, empresa_nombre) in clientes_info.items():
-        resultado = validar_cliente_individual(config, datos, tipo_cliente, config_key, empresa_nombre)
+        resultado = validar_cliente_individual(config, datos, tipo_cliente, config_key, empresa_nombre, entradas)
         resultados[tipo_cliente] = resultado
         print(f"{resultado['mensaje']}")
     
@@ -226,15 +267,25 @@ def cargar_datos_clientes(config):
     
     try:
 
-        logging.info("Cargando tabla de Sell out...")
-        datos['tabla_sell_out_consolidado'] = pd.read_excel(
-            ruta_datos_consolidado + config['archivo_tabla_sell_out']
-        )
+        logging.info("Cargando tablas de Sell out y Sell out ciudades...")
+        datos.update(leer_excels_en_paralelo({
+            'tabla_sell_out_consolidado': (
+                leer_consolidado,
+                ruta_datos_consolidado + config['archivo_tabla_sell_out'],
+                {'formato': config['formato_consolidados'], 'engine': MOTOR_EXCEL}
+            ),
+            'tabla_sell_out_ciudades_consolidado': (
+                leer_consolidado,
+                ruta_datos_consolidado + config['archivo_tabla_sell_out_ciudades'],
+                {'formato': config['formato_consolidados'], 'engine': MOTOR_EXCEL}
+            )
+        }))
 
-        logging.info("Cargando tabla de Sell out ciudades ...")
-        datos['tabla_sell_out_ciudades_consolidado'] = pd.read_excel(
-            ruta_datos_consolidado + config['archivo_tabla_sell_out_ciudades']
-        )
+        reducir_enteros(datos['tabla_sell_out_consolidado'])
+        datos['tabla_sell_out_consolidado']['Mes'] = normalizar_meses(datos['tabla_sell_out_consolidado']['Mes'])
+        reducir_enteros(datos['tabla_sell_out_ciudades_consolidado'])
+
+        datos['ultimos_meses'] = calcular_ultimos_meses(datos['tabla_sell_out_consolidado'])
 
         print("\n📋 Procesando clientes grandes...")
 
@@ -245,19 +296,31 @@ def cargar_datos_clientes(config):
             'FARMATODO': ('archivo_farmatodo', 'tabla_cliente_farmatodo', {})
         }
         
-        for cliente, (config_key, data_key, opciones) in clientes_carga.items():
-            if validaciones[cliente]['procesable']:
-                try:
-                    logging.info(f"Cargando tabla {cliente}...")
-                    datos[data_key] = pd.read_excel(
-                        ruta_datos + config[config_key],
-                        **opciones
-                    )
+        def cargar_cliente(ruta, cliente, **opciones):
+            try:
+                logging.info(f"Cargando tabla {cliente}...")
+                tabla = leer_excel_cacheado(
+                    ruta, estado=validaciones[cliente]['estado_archivo'], engine=MOTOR_EXCEL, **opciones
+                )
+                return reducir_enteros(tabla), None
+            except Exception as e:
+                logging.error(f"Error cargando {cliente}: {e}")
+                return None, e
+
+        lecturas = {
+            cliente: (cargar_cliente, ruta_datos + config[config_key], {'cliente': cliente, **opciones})
+            for cliente, (config_key, _, opciones) in clientes_carga.items()
+            if validaciones[cliente]['procesable']
+        }
+        cargas = leer_excels_en_paralelo(lecturas)
+
+        for cliente, (_, data_key, _) in clientes_carga.items():
+            if cliente in cargas:
+                datos[data_key], error = cargas[cliente]
+                if error is None:
                     print(f"   ✅ {cliente} cargado exitosamente")
-                except Exception as e:
-                    logging.error(f"Error cargando {cliente}: {e}")
-                    datos[data_key] = None
-                    print(f"   ❌ {cliente}: Error al cargar - {e}")
+                else:
+                    print(f"   ❌ {cliente}: Error al cargar - {error}")
             else:
                 datos[data_key] = None
                 print(f" {cliente}: Omitido (no procesable)")
@@ -291,55 +354,32 @@ def cargar_datos(config):
     
     try:
  
-        logging.info("Cargando tabla de ventas consolidado...")
-        datos['tabla_de_ventas_consolidado'] = pd.read_excel(
-            ruta_datos_consolidado + config['archivo_ventas_consolidado']
-        )
-
-        logging.info("Cargando tabla de consolidado costos...")
-        datos['tabla_consolidado_costos'] = pd.read_excel(
-            ruta_datos_consolidado + config['archivo_costos_consolidado']
-        )
-
-        logging.info("Cargando tabla de Sell out...")
-        datos['tabla_sell_out_consolidado'] = pd.read_excel(
-            ruta_datos_consolidado + config['archivo_tabla_sell_out']
-        )
-
-        logging.info("Cargando tabla de Sell out ciudades ...")
-        datos['tabla_sell_out_ciudades_consolidado'] = pd.read_excel(
-            ruta_datos_consolidado + config['archivo_tabla_sell_out_ciudades']
-        )
-
-        logging.info("Cargando tabla familia ...")
-        datos['tabla_familia_consolidado'] = pd.read_excel(
-            ruta_datos_consolidado + config['tabla_familia_consolidado']
-        )
+        lecturas = {
+            'tabla_de_ventas_consolidado': (leer_excel_cacheado, ruta_datos_consolidado + config['archivo_ventas_consolidado'], {'engine': MOTOR_EXCEL}),
+            'tabla_consolidado_costos': (leer_consolidado, ruta_datos_consolidado + config['archivo_costos_consolidado'], {'formato': config['formato_consolidados'], 'engine': MOTOR_EXCEL}),
+            'tabla_sell_out_consolidado': (leer_excel_cacheado, ruta_datos_consolidado + config['archivo_tabla_sell_out'], {'engine': MOTOR_EXCEL}),
+            'tabla_sell_out_ciudades_consolidado': (leer_excel_cacheado, ruta_datos_consolidado + config['archivo_tabla_sell_out_ciudades'], {'engine': MOTOR_EXCEL}),
+            'tabla_familia_consolidado': (leer_excel_cacheado, ruta_datos_consolidado + config['tabla_familia_consolidado'], {'engine': MOTOR_EXCEL})
+        }
 
         if config.get('archivo_ventas'):
-            logging.info("Cargando tabla de ventas...")
-            datos['tabla_ventas'] = pd.read_excel(
-                ruta_datos + config['archivo_ventas'], 
-                dtype=str
-            )
+            lecturas['tabla_ventas'] = (leer_excel_cacheado, ruta_datos + config['archivo_ventas'], {'dtype': str, 'engine': MOTOR_EXCEL})
         
         if config.get('archivo_clientes'):
-            logging.info("Cargando tabla de clientes...")
-            datos['tabla_clientes'] = pd.read_excel(
-                ruta_datos + config['archivo_clientes']
-            )
+            lecturas['tabla_clientes'] = (leer_excel_cacheado, ruta_datos + config['archivo_clientes'], {'engine': MOTOR_EXCEL})
         
         if config.get('archivo_metas'):
-            logging.info("Cargando tabla de cumplimiento...")
-            datos['tabla_de_cumplimiento'] = pd.read_excel(
-                ruta_datos + config['archivo_metas']
-            )
+            lecturas['tabla_de_cumplimiento'] = (leer_excel_cacheado, ruta_datos + config['archivo_metas'], {'engine': MOTOR_EXCEL})
         
         if config.get('archivo_costos'):
-            logging.info("Cargando tabla de costos...")
-            datos['tabla_de_costos'] = pd.read_excel(
-                ruta_datos + config['archivo_costos']
-            )
+            lecturas['tabla_de_costos'] = (leer_excel_cacheado, ruta_datos + config['archivo_costos'], {'usecols': es_columna_de_costos, 'engine': MOTOR_EXCEL})
+
+        logging.info(f"Cargando tablas: {', '.join(lecturas)}...")
+        datos.update(leer_excels_en_paralelo(lecturas))
+
+        # Los consolidados solo se leen, filtran y concatenan: sus enteros caben en int32.
+        for nombre_tabla in ['tabla_de_ventas_consolidado', 'tabla_consolidado_costos', 'tabla_familia_consolidado']:
+            reducir_enteros(datos[nombre_tabla])
         
         logging.info("Todas las tablas cargadas exitosamente")
         
@@ -368,18 +408,16 @@ def cargar_datos_rfm(config):
     
     try:
 
+        lecturas = {}
+
         if config.get('archivo_ventas_rfm'):
-            logging.info("Cargando tabla de ventas rfm...")
-            datos['tabla_ventas_rfm'] = pd.read_excel(
-                ruta_datos + config['archivo_ventas_rfm'], 
-                dtype=str
-            )
+            lecturas['tabla_ventas_rfm'] = (leer_excel_cacheado, ruta_datos + config['archivo_ventas_rfm'], {'dtype': str, 'engine': MOTOR_EXCEL})
         
         if config.get('archivo_clientes'):
-            logging.info("Cargando tabla de clientes...")
-            datos['tabla_clientes'] = pd.read_excel(
-                ruta_datos + config['archivo_clientes']
-            )
+            lecturas['tabla_clientes'] = (leer_excel_cacheado, ruta_datos + config['archivo_clientes'], {'engine': MOTOR_EXCEL})
+
+        logging.info(f"Cargando tablas RFM: {', '.join(lecturas)}...")
+        datos.update(leer_excels_en_paralelo(lecturas))
         
     except FileNotFoundError as e:
         logging.error(f"Archivo no encontrado: {e}")
@@ -402,40 +440,30 @@ def limpiar_formato_numerico_excel(serie):
         pd.Series: Serie con formato numérico limpio
     """
     if serie.dtype == 'object':
-        serie_limpia = serie.copy()
-        mask_no_nulos = serie_limpia.notna()
+        mask_no_nulos = serie.notna()
         
         if mask_no_nulos.any():
-            valores_str = serie_limpia[mask_no_nulos].astype(str)
-            valores_str = valores_str.str.replace(' ', '')
-            valores_str = valores_str.str.replace(',', '')
-            valores_str = valores_str.str.replace('.', '', regex=False)
-            
-            def corregir_ceros_extra(valor_str):
-                if pd.isna(valor_str) or valor_str == 'nan':
-                    return valor_str
-            
-                if len(valor_str) > 4 and valor_str.endswith('00000'):
-                    ceros_finales = 0
-                    for i in range(len(valor_str)-1, -1, -1):
-                        if valor_str[i] == '0':
-                            ceros_finales += 1
-                        else:
-                            break
-                
-                    if ceros_finales >= 5:
-                        valor_sin_ceros = valor_str.rstrip('0')
-                        if len(valor_sin_ceros) > 0:
-                            return valor_sin_ceros
-                
-                return valor_str
-
-            valores_str = valores_str.apply(corregir_ceros_extra)
-            serie_limpia[mask_no_nulos] = valores_str
-        
-        return serie_limpia
+            valores_str = serie.astype(str)
+            valores_str = valores_str.str.replace(RE_SEPARADORES_NUMERICOS, '', regex=True)
+            valores_str = valores_str.str.replace(RE_CEROS_EXTRA, r'\1', regex=True)
+            return valores_str.where(mask_no_nulos, serie)
     return serie
 
+def limpiar_texto_excel(serie):
+    """
+    Limpia una columna de texto proveniente de Excel: recorta y colapsa espacios, convierte los
+    marcadores de vacío ('nan', 'None', '') en NaN y quita el formato numérico de Excel.
+
+    Args:
+        serie (pd.Series): Columna original del Excel
+
+    Returns:
+        pd.Series: Columna limpia como texto (sin conversión a número)
+    """
+    valores = serie.astype(str).str.strip().str.replace(RE_ESPACIOS, ' ', regex=True)
+    valores = valores.mask(valores.isin(VALORES_NULOS_EXCEL))
+    return limpiar_formato_numerico_excel(valores)
+
 
 def limpiar_dataframe_excel(df):
     """
@@ -449,27 +477,27 @@ def limpiar_dataframe_excel(df):
         pd.DataFrame: DataFrame limpio
     """
 
-    df_limpio = df.copy()
-    df_limpio = df_limpio.dropna(how='all')
+    df_limpio = df.dropna(how='all')
     df_limpio = df_limpio.dropna(axis=1, how='all')
 
     if df_limpio.columns.dtype == 'object':
-        df_limpio.columns = df_limpio.columns.str.strip()
-        df_limpio.columns = df_limpio.columns.str.replace(r'\s+', ' ', regex=True)
-        df_limpio.columns = df_limpio.columns.str.replace(r'[^\w\s\.\-_]', '', regex=True)
+        df_limpio.columns = (
+            df_limpio.columns.str.strip()
+            .str.replace(RE_ESPACIOS, ' ', regex=True)
+            .str.replace(RE_CARACTERES_NO_VALIDOS, '', regex=True)
+        )
     
-    for columna in df_limpio.columns:
-        if df_limpio[columna].dtype == 'object':
-            df_limpio[columna] = df_limpio[columna].astype(str).str.strip()
-            df_limpio[columna] = df_limpio[columna].replace(['nan', 'None', '', 'NaN'], np.nan)
-            df_limpio[columna] = df_limpio[columna].str.replace(r'\s+', ' ', regex=True)
-            df_limpio[columna] = limpiar_formato_numerico_excel(df_limpio[columna])
+    # Solo las columnas de texto requieren limpieza; las numéricas y de fecha se dejan intactas.
+    for columna in df_limpio.select_dtypes(include='object').columns:
+        valores = limpiar_texto_excel(df_limpio[columna])
 
-            try:
-                df_limpio[columna] = pd.to_numeric(df_limpio[columna])
-            except (ValueError, TypeError):
-                pass
+        try:
+            valores = pd.to_numeric(valores)
+        except (ValueError, TypeError):
+            pass
+        df_limpio[columna] = valores
 
     df_limpio = df_limpio.reset_index(drop=True)
 
     return df_limpio
+
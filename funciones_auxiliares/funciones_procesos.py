@@ -2,8 +2,15 @@ import pandas as pd
 import numpy as np
 import funciones_auxiliares.funciones as funciones
 import logging
-from funciones_auxiliares.funciones_principales import (limpiar_dataframe_excel)
 import unicodedata
+from funciones_auxiliares.funciones_principales import limpiar_texto_excel
+
+MESES_ESPANOL = np.array([
+    "enero", "febrero", "marzo", "abril",
+    "mayo", "junio", "julio", "agosto",
+    "septiembre", "octubre", "noviembre", "diciembre"
+], dtype=object)
+MESES_NUMERO = np.array([f"{mes:02d}" for mes in range(1, 13)], dtype=object)
 
 def limpiar_referencia(valor):
     """
@@ -35,46 +42,65 @@ def procesar_ventas(tabla_ventas, ultima_fecha, path):
     """
     logging.info("Iniciando procesamiento de ventas...")
 
-    tabla_ventas["Fecha"] = tabla_ventas["Fecha"].apply(lambda x: x.strip() if isinstance(x, str) else x)
-    tabla_ventas["Fecha"] = pd.to_datetime(tabla_ventas["Fecha"], errors="coerce")
+    fechas = tabla_ventas["Fecha"]
+    if fechas.dtype == object:
+        fechas = fechas.str.strip().fillna(fechas)
+    fechas = funciones.convertir_fechas(fechas)
 
     registros_antes = len(tabla_ventas)
-    tabla_ventas = tabla_ventas[tabla_ventas["Fecha"] > ultima_fecha]
-    registros_despues = len(tabla_ventas)
+    filas_nuevas = (fechas > ultima_fecha).to_numpy()
+    registros_despues = int(filas_nuevas.sum())
     logging.info(f"Filtrado por fecha: {registros_antes} -> {registros_despues} registros")
-    
-    tabla_ventas.rename(columns={"Desc. item": "Desc.item"}, inplace=True)
-    tabla_ventas["Tipo de identificacion"] = np.nan
 
-    cols = list(tabla_ventas.columns)
-    cols.insert(3, cols.pop(cols.index("Tipo de identificacion")))
-    tabla_ventas = tabla_ventas[cols]
-    
-    tabla_ventas = tabla_ventas.iloc[:, :12]
-    tabla_ventas["Marca"] = tabla_ventas.apply(
-        lambda row: funciones.asignar_marca(row["Desc.item"], row.get("Marca", np.nan)), 
-        axis=1
+    # Se calculan primero las 12 columnas finales (con "Tipo de identificacion" vacía en la posición 3)
+    # y se recortan filas y columnas con un solo reindex antes de las derivaciones.
+    tabla_ventas = tabla_ventas.rename(columns={"Desc. item": "Desc.item"}).drop(
+        columns="Tipo de identificacion", errors="ignore"
     )
-    
-    tabla_ventas["TieneX"] = tabla_ventas["Desc.item"].apply(funciones.tiene_x)
-    tabla_ventas["Cantidades"] = tabla_ventas["Desc.item"].apply(funciones.extraer_cantidad)
-    tabla_ventas["Producto"] = tabla_ventas["Desc.item"].apply(funciones.extraer_producto)
-    
-    tabla_ventas.drop(columns=["TieneX"], inplace=True)
-    tabla_ventas["Producto_normalizado"] = tabla_ventas["Producto"].apply(funciones.normalizar_producto)
-    tabla_ventas.drop(columns=["Producto"], inplace=True)
-    tabla_ventas.rename(columns={"Producto_normalizado": "Producto"}, inplace=True)
-    
-    tabla_ventas["Cantidades"] = tabla_ventas["Cantidades"].apply(funciones.normalizar_cantidad)
-    tabla_ventas["Cantidades"] = tabla_ventas.apply(
-        lambda row: "1UND" if row["Cantidades"] == "NA" and not pd.isna(row["Desc.item"]) else row["Cantidades"], 
-        axis=1
+    cols = list(tabla_ventas.columns)
+    cols.insert(3, "Tipo de identificacion")
+    cols = cols[:12]
+
+    tabla_ventas = tabla_ventas[filas_nuevas].reindex(columns=cols)
+    if "Fecha" in tabla_ventas.columns:
+        tabla_ventas["Fecha"] = fechas[filas_nuevas]
+
+    desc = tabla_ventas["Desc.item"]
+    marca = funciones.asignar_marca(
+        desc,
+        tabla_ventas.get("Marca", pd.Series(np.nan, index=tabla_ventas.index))
     )
-    
-    tabla_ventas["Cantidad inv.sell_Int"] = tabla_ventas.apply(funciones.calcular_cantidad_sell_int, axis=1)
-    
+    cantidades = funciones.normalizar_cantidad(funciones.extraer_cantidad(desc))
+    cantidades = cantidades.mask(cantidades.eq("NA") & desc.notna(), "1UND")
+    producto = funciones.normalizar_producto(funciones.extraer_producto(desc))
+
+    tabla_ventas = tabla_ventas.assign(Marca=marca, Cantidades=cantidades, Producto=producto)
+    tabla_ventas["Cantidad inv.sell_Int"] = funciones.calcular_cantidad_sell_int(tabla_ventas)
+
     return tabla_ventas
     
+def normalizar_campos_clave(df):
+    """
+    Normaliza los campos usados para ubicar el último registro del consolidado en la entrada.
+
+    Usa `limpiar_texto_excel`, la misma limpieza de `limpiar_dataframe_excel` (espacios, valores nulos y
+    formato numérico de Excel), y luego convierte a número cada valor que lo sea, como hacía la conversión
+    con `pd.to_numeric`; así "0123" y 123 coinciden. Los valores que no son numéricos quedan como texto.
+    El consolidado y la entrada se comparan con exactamente las mismas reglas.
+
+    Parámetros:
+        df (pd.DataFrame): Columnas clave a normalizar.
+
+    Returns:
+        pd.DataFrame: Columnas clave normalizadas, con el mismo índice de entrada.
+    """
+    columnas = {}
+    for columna in df.columns:
+        texto = limpiar_texto_excel(df[columna])
+        numeros = pd.to_numeric(texto, errors='coerce')
+        columnas[columna] = texto.astype(object).mask(numeros.notna(), numeros.astype(float))
+    return pd.DataFrame(columnas, index=df.index)
+
 def filtrar_registros_nuevos_ventas(df_entrada, df_consolidado):
     """
     Compara la tabla de ventas nueva con el consolidado para identificar los registros nuevos.
@@ -95,30 +121,53 @@ def filtrar_registros_nuevos_ventas(df_entrada, df_consolidado):
         'Valor bruto local'
     ]
 
-    df_entrada['Fecha'] = pd.to_datetime(df_entrada['Fecha'])
-    df_consolidado['Fecha'] = pd.to_datetime(df_consolidado['Fecha'])
+    df_entrada['Fecha'] = funciones.convertir_fechas(df_entrada['Fecha'], errors="raise")
+    df_consolidado['Fecha'] = funciones.convertir_fechas(df_consolidado['Fecha'], errors="raise")
     
-    ultimo_registro_normalizado = df_consolidado[campos_clave].astype(str)
-    ultimo_registro_normalizado = limpiar_dataframe_excel(ultimo_registro_normalizado).iloc[-1]
+    ultimo_normalizado = normalizar_campos_clave(df_consolidado[campos_clave].iloc[[-1]])
+    ultimo_registro_normalizado = ultimo_normalizado.iloc[0]
 
     fecha_max_consolidado = df_consolidado['Fecha'].max()
-    df_filtrado_fecha = df_entrada[df_entrada['Fecha'] >= fecha_max_consolidado].copy()
-
-    df_filtrado_fecha = df_filtrado_fecha.reset_index(drop=True)
-
-    entrada_normalizada = df_filtrado_fecha[campos_clave].astype(str)
-    entrada_normalizada = limpiar_dataframe_excel(entrada_normalizada).reset_index(drop=True)
-
-    coincidencias = entrada_normalizada.eq(ultimo_registro_normalizado).all(axis=1)
-
-    if coincidencias.any():
-        idx = coincidencias[coincidencias].index[0]
-        df_nuevos = df_filtrado_fecha.loc[idx+1:].copy()
-        df_nuevos = df_nuevos.rename(columns={"EAN 13": "EAN"})
+    fechas_entrada = df_entrada['Fecha']
+
+    # El registro buscado tiene la misma fecha que el último del consolidado, por lo que solo
+    # se normalizan las filas de la entrada con fecha igual a la máxima del consolidado.
+    if fechas_entrada.is_monotonic_increasing:
+        valores_fecha = fechas_entrada.to_numpy()
+        fecha_buscada = np.datetime64(fecha_max_consolidado)
+        inicio = np.searchsorted(valores_fecha, fecha_buscada, side='left')
+        fin = np.searchsorted(valores_fecha, fecha_buscada, side='right')
+        df_filtrado_fecha = df_entrada.iloc[inicio:]
+        posiciones_candidatos = np.arange(fin - inicio)
+    else:
+        df_filtrado_fecha = df_entrada[fechas_entrada >= fecha_max_consolidado]
+        posiciones_candidatos = np.flatnonzero((df_filtrado_fecha['Fecha'] == fecha_max_consolidado).to_numpy())
+
+    # Las filas se ubican por posición dentro de df_filtrado_fecha, sin reiniciar índices.
+    entrada_normalizada = normalizar_campos_clave(df_filtrado_fecha[campos_clave].iloc[posiciones_candidatos])
+
+    # Se compara una huella por fila y solo las filas con la misma huella se verifican campo a campo,
+    # lo que además descarta colisiones y mantiene que un campo vacío nunca coincide.
+    huellas = pd.util.hash_pandas_object(entrada_normalizada, index=False).to_numpy()
+    huella_ultimo = pd.util.hash_pandas_object(ultimo_normalizado, index=False).to_numpy()[0]
+
+    idx = None
+    for posicion in np.flatnonzero(huellas == huella_ultimo):
+        fila = entrada_normalizada.iloc[posicion]
+        if all(fila[campo] == ultimo_registro_normalizado[campo] for campo in campos_clave):
+            idx = int(posiciones_candidatos[posicion])
+            break
+
+    if idx is not None:
+        df_nuevos = df_filtrado_fecha.iloc[idx+1:].rename(columns={"EAN 13": "EAN"})
         print(f"Se encontró el último registro del consolidado en la entrada. Nuevos desde el índice {idx + 1}.")
     else:
         df_nuevos = None
         print("El último registro del consolidado NO se encontró en la entrada. No se establecen registros nuevos. ")
+        logging.warning(
+            "No se encontró el último registro del consolidado en la entrada; "
+            f"no se agregan ventas nuevas. Registro buscado: {ultimo_registro_normalizado.to_dict()}"
+        )
 
     return df_nuevos
 
@@ -134,8 +183,14 @@ def procesar_clientes(tabla_clientes):
         pd.DataFrame: DataFrame de clientes procesado y sin duplicados.    
     """
 
-    tabla_clientes['nit'] = tabla_clientes['nit'].astype(str).str.strip()
-    tabla_clientes = tabla_clientes.drop_duplicates(subset=["nit"])
+    nit = tabla_clientes['nit'].astype(str).str.strip()
+
+    # Los códigos de factorize siguen el orden de aparición, así que la primera posición de cada
+    # código conserva la primera fila de cada nit, igual que drop_duplicates.
+    codigos, _ = pd.factorize(nit)
+    _, primeras = np.unique(codigos, return_index=True)
+
+    tabla_clientes = tabla_clientes.iloc[primeras].assign(nit=nit.to_numpy()[primeras])
     
     return tabla_clientes
 
@@ -149,43 +204,49 @@ def crear_conteo_linea_mercado(tabla_ventas, año_debug=None):
         año_debug (int, opcional): Año para propósitos de depuración (no se usa actualmente).
 
     Returns:
-        pd.DataFrame: Tabla agrupada con el conteo de compras (numCompras) por semana.
+        pd.DataFrame: Tabla agrupada con el conteo de compras (numCompras) por semana, ordenada por
+            Año, Mes (alfabéticamente), Semana, Mes_num y las columnas opcionales, como un groupby ordenado.
     """
 
-    tabla_ventas = tabla_ventas.copy()
-    tabla_ventas["Fecha"] = pd.to_datetime(tabla_ventas["Fecha"], errors='coerce')
-    
-    def ceiling_date_week_start_monday(fecha):
-        fecha = pd.to_datetime(fecha)
-        if fecha.weekday() == 0:
-            return fecha.normalize()
-        else:
-            return (fecha - pd.to_timedelta(fecha.weekday(), unit='d')).normalize()
-        
-
-    tabla_ventas["Semana"] = tabla_ventas["Fecha"].apply(ceiling_date_week_start_monday)
-    tabla_ventas = tabla_ventas.dropna(subset=["Semana"])
-  
-    meses_espanol = {
-        1: "enero", 2: "febrero", 3: "marzo", 4: "abril",
-        5: "mayo", 6: "junio", 7: "julio", 8: "agosto",
-        9: "septiembre", 10: "octubre", 11: "noviembre", 12: "diciembre"
-    }
-    
-    tabla_ventas["Mes"] = tabla_ventas["Semana"].dt.month.map(meses_espanol)
-    tabla_ventas["Año"] = tabla_ventas["Semana"].dt.year.astype(str)
-    tabla_ventas["Mes_num"] = tabla_ventas["Semana"].dt.month.astype(str).str.zfill(2)
-
-
-    columnas_agrupacion = ["Año", "Mes", "Semana", "Mes_num"]
-    if "Linea de mercado" in tabla_ventas.columns:
-        columnas_agrupacion.append("Linea de mercado")
-    if "Razon social" in tabla_ventas.columns:
-        columnas_agrupacion.append("Razon social")
-    
-    resultado = tabla_ventas.groupby(columnas_agrupacion).size().reset_index(name="numCompras")
-       
-    return resultado
+    fechas = funciones.convertir_fechas(tabla_ventas["Fecha"])
+    semana = (fechas - pd.to_timedelta(fechas.dt.weekday, unit='D')).dt.normalize()
+
+    # Año, Mes y Mes_num dependen solo de la semana, así que se agrupa por la semana y las columnas
+    # opcionales, combinando sus códigos enteros en una sola clave.
+    columnas_clave = ["Semana"] + [c for c in ["Linea de mercado", "Razon social"] if c in tabla_ventas.columns]
+    series_clave = [semana] + [tabla_ventas[c] for c in columnas_clave[1:]]
+
+    clave = np.zeros(len(tabla_ventas), dtype=np.int64)
+    validas = np.ones(len(tabla_ventas), dtype=bool)
+    valores_unicos = []
+    for serie in series_clave:
+        codigos, unicos = pd.factorize(serie, sort=True)
+        clave = clave * len(unicos) + codigos
+        validas &= codigos >= 0
+        valores_unicos.append(unicos)
+
+    # np.unique devuelve las claves en orden cronológico de semana; el orden final se fija al terminar
+    claves_unicas, conteos = np.unique(clave[validas], return_counts=True)
+
+    columnas = {}
+    for columna, unicos in zip(reversed(columnas_clave), reversed(valores_unicos)):
+        claves_unicas, posiciones = np.divmod(claves_unicas, len(unicos))
+        columnas[columna] = unicos.take(posiciones)
+
+    semanas = pd.Series(columnas["Semana"])
+    posicion_mes = semanas.dt.month.to_numpy() - 1
+    resultado = pd.DataFrame({
+        "Año": semanas.dt.year.astype(str),
+        "Mes": MESES_ESPANOL[posicion_mes],
+        "Semana": semanas,
+        "Mes_num": MESES_NUMERO[posicion_mes],
+        **{columna: columnas[columna] for columna in columnas_clave[1:]},
+        "numCompras": conteos
+    })
+
+    # Mismo orden de filas que el agrupamiento por Año, Mes (alfabético), Semana, Mes_num y demás claves
+    columnas_orden = ["Año", "Mes", "Semana", "Mes_num"] + columnas_clave[1:]
+    return resultado.sort_values(columnas_orden, ignore_index=True)
 
 ## PROCESAMIENTO DE COSTOS
 def consolidar_costos_historicos(datos, tabla_familia_consolidado, año_actual):
@@ -216,8 +277,12 @@ def consolidar_costos_historicos(datos, tabla_familia_consolidado, año_actual):
         tabla_costo_entrada["Incluir referencia(Si/No)"] = None
 
     tabla_costos_consolidado["Referencia"] = tabla_costos_consolidado["Referencia"].astype(str)
-    tabla_familia_consolidado["Referencia"] = tabla_familia_consolidado["Referencia"].astype(str)
-    consolidado_costo = tabla_costos_consolidado.merge(tabla_familia_consolidado, on="Referencia", how="left")
+    familia_por_referencia = tabla_familia_consolidado.assign(
+        Referencia=tabla_familia_consolidado["Referencia"].astype(str)
+    ).set_index("Referencia")
+    consolidado_costo = tabla_costos_consolidado.join(
+        familia_por_referencia, on="Referencia", how="left", lsuffix="_x", rsuffix="_y"
+    )
 
 
     if "Incluir referencia(Si/No).y" in consolidado_costo.columns:
@@ -230,23 +295,19 @@ def consolidar_costos_historicos(datos, tabla_familia_consolidado, año_actual):
         ["Referencia", "Desc.item", "Instalación", "U.M.", "Costo prom.", "Mes", "Año", "Marca", "Incluir referencia(Si/No)"]
     ]
 
-    consolidado_año_actual = consolidado_costo_filtrado[consolidado_costo_filtrado["Año"] == año_actual]
+    es_año_actual = (consolidado_costo_filtrado["Año"] == año_actual).to_numpy()
+    es_historico = (consolidado_costo_filtrado["Año"] < año_actual).to_numpy()
+
+    consolidado_año_actual = consolidado_costo_filtrado[es_año_actual]
     if len(consolidado_año_actual) > 0:
 
-        meses_orden = {
-            'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
-            'julio': 7, 'agosto': 8, 'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12
-        }
-        
-    
-        consolidado_año_actual['mes_num'] = consolidado_año_actual['Mes'].str.lower().map(meses_orden)
-        ultimo_mes_num = consolidado_año_actual['mes_num'].max()
+        meses = pd.Categorical(consolidado_año_actual['Mes'].str.lower(), categories=MESES_ESPANOL)
+        ultimo_mes_num = meses.codes.max() + 1
         
         proximo_mes_num = ultimo_mes_num + 1 if ultimo_mes_num < 12 else 1
         proximo_año = año_actual if ultimo_mes_num < 12 else año_actual + 1
         
-        meses_nombres = {v: k for k, v in meses_orden.items()}
-        proximo_mes_nombre = meses_nombres[proximo_mes_num]
+        proximo_mes_nombre = MESES_ESPANOL[int(proximo_mes_num) - 1]
         
         tabla_costo_entrada_filtrada = tabla_costo_entrada[
             (tabla_costo_entrada["Mes"].str.lower().str.strip() == proximo_mes_nombre) & 
@@ -264,12 +325,11 @@ def consolidar_costos_historicos(datos, tabla_familia_consolidado, año_actual):
         tabla_costo_entrada_filtrada = tabla_costo_entrada[tabla_costo_entrada["Año"] == año_actual]
 
 
-    consolidado_historico = consolidado_costo_filtrado[consolidado_costo_filtrado["Año"] < año_actual]
-    consolidado_año_actual_existente = consolidado_costo_filtrado[consolidado_costo_filtrado["Año"] == año_actual]
+    # Histórico primero y luego el año actual, tomados en una sola selección posicional
+    posiciones = np.concatenate([np.flatnonzero(es_historico), np.flatnonzero(es_año_actual)])
 
     consolidado_final = pd.concat([
-        consolidado_historico, 
-        consolidado_año_actual_existente, 
+        consolidado_costo_filtrado.iloc[posiciones],
         tabla_costo_entrada_filtrada
     ], ignore_index=True)
     
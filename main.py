@@ -2,6 +2,7 @@ import pandas as pd
 import os
 
 from funciones_auxiliares.funciones_principales import (configurar_rutas, cargar_datos)
+from funciones_auxiliares.funciones_excel import guardar_excel, guardar_consolidado
 from funciones_auxiliares.funciones_procesos import (procesar_ventas, filtrar_registros_nuevos_ventas, procesar_clientes, crear_conteo_linea_mercado, consolidar_costos_historicos)
 
 def ejecutar_actualizacion_ventas():
@@ -18,7 +19,7 @@ def ejecutar_actualizacion_ventas():
 
     if df_nuevos is None:
         print(" No hay nuevos registros de ventas para procesar, no fue encontrado el último registro del consolidado.")
-        datos['tabla_de_ventas_consolidado'].to_excel(ruta_salida, index=False)
+        guardar_excel(datos['tabla_de_ventas_consolidado'], ruta_salida)
         return
 
     if df_nuevos.empty:
@@ -35,7 +36,7 @@ def ejecutar_actualizacion_ventas():
     print("\n Concatenando con consolidado histórico de ventas...")
     df_consolidado = datos['tabla_de_ventas_consolidado']
     df_consolidado_ventas_actualizado = pd.concat([df_consolidado, tabla_ventas_procesada], ignore_index=True)
-    df_consolidado_ventas_actualizado.to_excel(ruta_salida, index=False)
+    guardar_excel(df_consolidado_ventas_actualizado, ruta_salida)
 
     print(f" Archivo ventas actualizado guardado en: {ruta_salida}")
 
@@ -54,7 +55,7 @@ def ejecutar_procesamiento_clientes():
     )
 
     ruta_salida = os.path.join(config['salida'], 'Tabla de clientes.xlsx')
-    tabla_clientes_procesada.to_excel(ruta_salida, index=False)
+    guardar_excel(tabla_clientes_procesada, ruta_salida)
 
     print(f" Archivo clientes actualizado guardado en: {ruta_salida}")
     return tabla_clientes_procesada
@@ -67,7 +68,7 @@ def ejecutar_creacion_tabla_conteo_mercado(df_consolidado_ventas_actualizado):
     )
 
     ruta_salida = os.path.join(config['salida'], 'Conteo linea de mercado.xlsx')
-    tabla_conteo_mercado.to_excel(ruta_salida, index=False)
+    guardar_excel(tabla_conteo_mercado, ruta_salida)
 
     print(f" Archivo tabla conteo de mercado guardado en: {ruta_salida}")
 
@@ -80,7 +81,7 @@ def ejecutar_actualizar_costos(datos, tabla_marca_referencia):
     )
 
     ruta_salida = os.path.join(config['salida'], 'Consolidado Costos.xlsx')
-    consolidado_costos_historico.to_excel(ruta_salida, index=False)
+    ruta_salida = guardar_consolidado(consolidado_costos_historico, ruta_salida, config['formato_consolidados'])
     print(f" Archivo tabla de costos actualizada guardada en: {ruta_salida}")
 
 
@@ -15,6 +15,24 @@ from datetime import datetime, date
 from typing import Tuple, Optional, List
 
 from funciones_auxiliares.funciones_principales import (configurar_rutas, cargar_datos_rfm)
+from funciones_auxiliares.funciones_excel import guardar_excel
+
+# Reemplazos de caracteres aplicados a los nombres de columnas en una sola pasada
+TRADUCCION_COLUMNAS = str.maketrans({' ': '_', 'ó': 'o', '.': ''})
+
+# Referencias de producto excluidas del análisis, como número y como texto
+# (cargar_datos_rfm lee la tabla de ventas con dtype=str)
+REFERENCIAS_EXCLUIR = frozenset(
+    referencia
+    for numero in (10133, 10137, 10138, 10135, 13035, 13034, 1501, 1502)
+    for referencia in (numero, str(numero))
+)
+
+# Columnas de ventas que usa el análisis RFM, además de la razón social del cliente
+COLUMNAS_VENTAS_RFM = ['nit', 'linea_de_mercado', 'fecha', 'valor_bruto_local']
+
+# Cortes internos de los quintiles, los mismos que usa pd.qcut(..., 5)
+CORTES_QUINTILES = np.linspace(0, 1, 6)[1:-1]
 
 class RFMAnalysis:
     """
@@ -55,6 +73,13 @@ class RFMAnalysis:
             'Hibernando': [332, 322, 231, 241, 251, 233, 232, 223, 222, 132, 123, 122, 212, 211],
             'Inactivos': [111, 112, 121, 131, 141, 151]
         }
+
+        # Índice inverso score -> categoría para asignar categorías sin recorrer el diccionario por fila
+        self._score_to_cat = {
+            score: categoria
+            for categoria, scores in self.categorias_rfm.items()
+            for score in scores
+        }
     
     def limpiar_nombres_columnas(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -73,10 +98,7 @@ class RFMAnalysis:
             
         """
 
-        df.columns = df.columns.str.lower()
-        df.columns = df.columns.str.replace(' ', '_', regex=False)
-        df.columns = df.columns.str.replace('ó', 'o', regex=False)
-        df.columns = df.columns.str.replace('.', '', regex=False)
+        df.columns = df.columns.str.lower().str.translate(TRADUCCION_COLUMNAS)
         return df
     
     def limpiar_nit(self, nit_series: pd.Series) -> pd.Series:
@@ -87,7 +109,7 @@ class RFMAnalysis:
         manteniendo solo la parte principal del número de identificación.
         """
         
-        return nit_series.astype(str).str.replace(r'-.*', '', regex=True)
+        return nit_series.astype(str).str.split('-', n=1).str[0]
     
     def cargar_y_limpiar_datos(self, bd_ventas, bd_clientes) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
@@ -97,22 +119,25 @@ class RFMAnalysis:
         - Limpieza de nombres de columnas
         - Limpieza de NITs
         - Conversión de tipos de datos
-        - Eliminación de duplicados en clientes
+        - Eliminación de duplicados en clientes (uno por NIT)
         - Estandarización de nombres de columnas """
 
         bd_ventas = self.limpiar_nombres_columnas(bd_ventas)
         bd_ventas['nit'] = self.limpiar_nit(bd_ventas['nit'])
         
         if 'valor_bruto_local' in bd_ventas.columns:
-            bd_ventas['valor_bruto_local'] = bd_ventas['valor_bruto_local'].astype(str).str.replace(',', '.')
-            bd_ventas['valor_bruto_local'] = pd.to_numeric(bd_ventas['valor_bruto_local'], errors='coerce')
+            valores = bd_ventas['valor_bruto_local']
+            # Solo los valores leídos como texto pueden traer coma decimal
+            if valores.dtype == object:
+                valores = valores.astype(str).str.replace(',', '.')
+            bd_ventas['valor_bruto_local'] = pd.to_numeric(valores, errors='coerce')
 
         bd_clientes = self.limpiar_nombres_columnas(bd_clientes)
         bd_clientes.columns = ['tipo_identificacion', 'nit', 'razon_social']
         bd_clientes['nit'] = self.limpiar_nit(bd_clientes['nit'])
         
-        bd_clientes = bd_clientes.drop_duplicates(keep='first')
-        bd_clientes = bd_clientes.drop('tipo_identificacion', axis=1)
+        # Un único cliente por NIT, para que el cruce con ventas no duplique transacciones
+        bd_clientes = bd_clientes.drop(columns=['tipo_identificacion']).drop_duplicates(subset=['nit'], keep='first')
         
         return bd_ventas, bd_clientes
     
@@ -129,80 +154,113 @@ class RFMAnalysis:
         
         Args:
             bd_ventas (pd.DataFrame): DataFrame con datos de ventas limpios
-            bd_clientes (pd.DataFrame): DataFrame con datos de clientes limpios
+            bd_clientes (pd.DataFrame): DataFrame con datos de clientes limpios, un registro por NIT
             ruta_salida (str): Ruta donde guardar archivos de salida
             
         Returns:
-            pd.DataFrame: DataFrame de ventas filtrado y enriquecido con datos de clientes
+            pd.DataFrame: DataFrame de ventas filtrado y enriquecido con datos de clientes,
+                          con solo las columnas usadas por el análisis RFM
             
         Note:
             - Se excluyen las referencias: 10133, 10137, 10138, 10135, 13035, 13034, 1501, 1502
             - Se genera un archivo Excel con NITs que no tienen razón social asociada
-            - Se realiza un LEFT JOIN entre ventas y clientes por NIT
+            - La razón social se asigna por NIT (equivalente a un LEFT JOIN con clientes)
         """
 
-        referencias_excluir = [10133, 10137, 10138, 10135, 13035, 13034, 1501, 1502]
-        bd_ventas = bd_ventas[~bd_ventas['referencia'].isin(referencias_excluir)]
-        bd_ventas = bd_ventas[bd_ventas['referencia'].notna()]
+        referencia = bd_ventas['referencia']
+        bd_ventas = bd_ventas[referencia.notna() & ~referencia.isin(REFERENCIAS_EXCLUIR)]
 
         if 'razon_social' in bd_ventas.columns:
             bd_ventas = bd_ventas.drop(columns=['razon_social'])
 
-        bd_ventas = pd.merge(bd_ventas, bd_clientes, on='nit', how='left')
+        # Con un cliente por NIT, la razón social se busca por NIT sin construir un cruce completo
+        razon_social = bd_ventas['nit'].map(bd_clientes.set_index('nit')['razon_social'])
+
+        # Solo las columnas que usa el análisis pasan al resultado
+        columnas_rfm = [columna for columna in COLUMNAS_VENTAS_RFM if columna in bd_ventas.columns]
+        bd_ventas_rfm = bd_ventas[columnas_rfm].assign(razon_social=razon_social)
+        # Pocos canales distintos: como categoría se agrupan por códigos enteros
+        bd_ventas_rfm['linea_de_mercado'] = bd_ventas_rfm['linea_de_mercado'].astype('category')
         
-        nit_sin_razonsocial = bd_ventas[bd_ventas['razon_social'].isna()]
+        nit_sin_razonsocial = bd_ventas[razon_social.isna()].assign(razon_social=np.nan)
         ruta_salida_nit = os.path.join(ruta_salida, 'nit_sin_razonsocial.xlsx')
-        nit_sin_razonsocial.to_excel(ruta_salida_nit, index=False)
+        guardar_excel(nit_sin_razonsocial, ruta_salida_nit)
         print(f" Resultados de  nits sin razon social guardados en {ruta_salida_nit}")
 
 
-        if 'fecha' in bd_ventas.columns:
-            bd_ventas['fecha'] = pd.to_datetime(bd_ventas['fecha'], errors='coerce')
+        if 'fecha' in bd_ventas_rfm.columns:
+            bd_ventas_rfm['fecha'] = pd.to_datetime(bd_ventas_rfm['fecha'], errors='coerce')
     
-        return bd_ventas
+        return bd_ventas_rfm
+    
+    @staticmethod
+    def puntuar_quintiles(valores: pd.Series, invertir: bool = False) -> pd.Series:
+        """
+        Asigna a cada valor su quintil (1-5) dentro de la serie.
+        
+        Equivale a `pd.qcut(valores, 5, labels=[1,2,3,4,5])`: los cuatro cortes internos se
+        calculan una sola vez y cada valor se ubica con `np.searchsorted`, sin construir
+        intervalos ni un Categorical. Un valor igual a un corte queda en el quintil inferior.
+        
+        Args:
+            valores (pd.Series): Valores numéricos a puntuar
+            invertir (bool): Si es True, el quintil más bajo recibe 5 y el más alto 1
+            
+        Returns:
+            pd.Series: Puntajes int8 de 1 a 5 con el mismo índice que `valores`
+        """
+        cortes = valores.quantile(CORTES_QUINTILES).to_numpy()
+        puntajes = (np.searchsorted(cortes, valores.to_numpy(), side='left') + 1).astype(np.int8)
+        if invertir:
+            puntajes = 6 - puntajes
+        return pd.Series(puntajes, index=valores.index)
     
     def calcular_rfm_scores(self, df: pd.DataFrame, fecha_analisis: date) -> pd.DataFrame:
         """
-        Calcula los scores RFM (Recency, Frequency, Monetary) para cada cliente.
+        Calcula los scores RFM (Recency, Frequency, Monetary) para cada cliente de cada canal.
         
         Calcula las tres métricas fundamentales del análisis RFM:
         - Recency: Días desde la última compra hasta la fecha de análisis
         - Frequency: Número total de transacciones del cliente
         - Monetary: Valor total de las compras del cliente
         
-        Cada métrica se convierte en un score de 1-5 usando quintiles:
+        Cada métrica se convierte en un score de 1-5 usando los quintiles de su canal:
         - Recency: 5 = más reciente, 1 = menos reciente
         - Frequency: 5 = más frecuente, 1 = menos frecuente  
         - Monetary: 5 = mayor valor, 1 = menor valor
         
         Args:
-            df (pd.DataFrame): DataFrame con columnas: customer_id, order_date, revenue
+            df (pd.DataFrame): DataFrame con columnas: canal, customer_id, order_date, revenue
             fecha_analisis (date): Fecha de referencia para calcular la recencia
             
         Returns:
-            pd.DataFrame: DataFrame con scores RFM y métricas calculadas
+            pd.DataFrame: DataFrame con scores RFM y métricas calculadas, con el canal al final
             
         """
         fecha_analisis = pd.to_datetime(fecha_analisis)
-        rfm_df = df.groupby('customer_id').agg({
-            'order_date': lambda x: (fecha_analisis - x.max()).days,  # Recency
-            'customer_id': 'count',  # Frequency
-            'revenue': 'sum'  # Monetary
-        }).rename(columns={
-            'order_date': 'recency_days',
-            'customer_id': 'frequency',
-            'revenue': 'monetary'
-        })
+        # La recencia de un cliente es el mínimo de días desde cada compra hasta la fecha de análisis
+        df = df.assign(dias=(fecha_analisis - df['order_date']).dt.days)
+        rfm_df = df.groupby(['canal', 'customer_id'], observed=True).agg(
+            recency_days=('dias', 'min'),  # Recency
+            frequency=('order_date', 'size'),  # Frequency
+            monetary=('revenue', 'sum')  # Monetary
+        )
         
-        rfm_df['recency_score'] = pd.qcut(rfm_df['recency_days'], 5, labels=[5,4,3,2,1], duplicates='drop')
-        rfm_df['frequency_score'] = pd.qcut(rfm_df['frequency'].rank(method='first'), 5, labels=[1,2,3,4,5], duplicates='drop')
-        rfm_df['monetary_score'] = pd.qcut(rfm_df['monetary'], 5, labels=[1,2,3,4,5], duplicates='drop')
+        # Los quintiles se calculan dentro de cada canal
+        por_canal = rfm_df.groupby(level='canal', observed=True)
+        rfm_df['recency_score'] = por_canal['recency_days'].transform(self.puntuar_quintiles, invertir=True)
+        rfm_df['frequency_score'] = por_canal['frequency'].transform(
+            lambda s: self.puntuar_quintiles(s.rank(method='first')))
+        rfm_df['monetary_score'] = por_canal['monetary'].transform(self.puntuar_quintiles)
         
-        rfm_df['rfm_score'] = (rfm_df['recency_score'].astype(str) + 
-                              rfm_df['frequency_score'].astype(str) + 
-                              rfm_df['monetary_score'].astype(str)).astype(int)
+        # Los puntajes son int8; el score de tres dígitos se arma en int16 para no desbordar
+        rfm_df['rfm_score'] = (rfm_df['recency_score'].astype('int16') * 100 +
+                              rfm_df['frequency_score'].astype('int16') * 10 +
+                              rfm_df['monetary_score'].astype('int16'))
+        rfm_df['frequency'] = rfm_df['frequency'].astype('int32')
         
-        return rfm_df.reset_index()
+        rfm_df = rfm_df.reset_index()
+        return rfm_df[[*rfm_df.columns.drop('canal'), 'canal']]
     
     def asignar_categoria_rfm(self, score: int) -> str:
         """
@@ -220,10 +278,7 @@ class RFMAnalysis:
                  
         """
 
-        for categoria, scores in self.categorias_rfm.items():
-            if score in scores:
-                return categoria
-        return 'No clasificado'
+        return self._score_to_cat.get(score, 'No clasificado')
     
     def procesar_rfm_por_canal(self, ruta_salida, bd_agregada_completa: pd.DataFrame, 
                               canales: Optional[List[str]] = None,
@@ -234,8 +289,8 @@ class RFMAnalysis:
         Procesa el análisis RFM para cada canal de venta y genera resultados consolidados.
         
         Ejecuta el análisis RFM completo para cada canal de interés:
-        1. Filtra datos por canal
-        2. Calcula scores RFM
+        1. Filtra los canales de interés
+        2. Calcula scores RFM por canal en un solo agrupamiento
         3. Asigna categorías de cliente
         4. Consolida resultados de todos los canales
         5. Exporta resultados a CSV
@@ -260,41 +315,36 @@ class RFMAnalysis:
             fecha_analisis = date.today()
         
         canales = self.canales_interes
-        total_segmentos = []
-        
-        for canal in canales:
-            bd_canal = bd_agregada_completa[bd_agregada_completa['canal'] == canal].copy()
-            if bd_canal.empty:
-                continue
-
-            rfm_resultado = self.calcular_rfm_scores(bd_canal, fecha_analisis)
-            rfm_resultado['canal'] = canal
-            total_segmentos.append(rfm_resultado)
-   
-        if total_segmentos:
-            total_segmentos_df = pd.concat(total_segmentos, ignore_index=True)
-            total_segmentos_df['categoria'] = total_segmentos_df['rfm_score'].apply(self.asignar_categoria_rfm)
-            
-            total_segmentos_df = total_segmentos_df.rename(columns={
-                'customer_id': 'id_cliente',
-                'recency_days': 'dias_recencia',
-                'frequency': 'num_transacciones',
-                'monetary': 'monto',
-                'recency_score': 'recencia_punt',
-                'frequency_score': 'frecuencia_punt',
-                'monetary_score': 'valor_punt',
-                'rfm_score': 'score_rfm'
-            })
-            
-            total_segmentos_df['ingresos'] = total_segmentos_df['monto']
 
-            ruta_salida_csv = os.path.join(ruta_salida, 'rfm_segmentos.csv')
-            total_segmentos_df.to_csv(ruta_salida_csv, index=False)
-            print(f" Resultados de segmentos Rfm guardados en {ruta_salida_csv}")
-            
-            return total_segmentos_df
-        else:
+        # Un solo agrupamiento por canal y cliente; el canal categórico conserva el orden de `canales`
+        canal = pd.Categorical(bd_agregada_completa['canal'], categories=canales)
+        bd_canales = bd_agregada_completa.assign(canal=canal)[canal.codes >= 0]
+        if bd_canales.empty:
             return pd.DataFrame()
+
+        total_segmentos_df = self.calcular_rfm_scores(bd_canales, fecha_analisis)
+        total_segmentos_df['categoria'] = (total_segmentos_df['rfm_score']
+                                         .map(self._score_to_cat)
+                                         .fillna('No clasificado'))
+        
+        total_segmentos_df = total_segmentos_df.rename(columns={
+            'customer_id': 'id_cliente',
+            'recency_days': 'dias_recencia',
+            'frequency': 'num_transacciones',
+            'monetary': 'monto',
+            'recency_score': 'recencia_punt',
+            'frequency_score': 'frecuencia_punt',
+            'monetary_score': 'valor_punt',
+            'rfm_score': 'score_rfm'
+        })
+        
+        total_segmentos_df['ingresos'] = total_segmentos_df['monto']
+
+        ruta_salida_csv = os.path.join(ruta_salida, 'rfm_segmentos.csv')
+        total_segmentos_df.to_csv(ruta_salida_csv, index=False)
+        print(f" Resultados de segmentos Rfm guardados en {ruta_salida_csv}")
+        
+        return total_segmentos_df
     
     def ejecutar_analisis_completo(self, ventas, clientes, 
                                   ruta_salida: str) -> pd.DataFrame:
@@ -331,21 +381,20 @@ class RFMAnalysis:
         bd_ventas, bd_clientes = self.cargar_y_limpiar_datos(ventas, clientes)
         bd_ventas = self.filtrar_datos_ventas(bd_ventas, bd_clientes, ruta_salida)
         bd_agregada_completa = (bd_ventas
-                               .groupby(['linea_de_mercado', 'razon_social', 'fecha'])['valor_bruto_local']
+                               .groupby(['linea_de_mercado', 'razon_social', 'fecha'], observed=True)['valor_bruto_local']
                                .sum()
                                .reset_index())
         
         bd_agregada_completa.columns = ['canal', 'customer_id', 'order_date', 'revenue']
         bd_agregada_completa['order_date'] = pd.to_datetime(bd_agregada_completa['order_date'])
-        bd_agregada_completa['revenue_miles'] = bd_agregada_completa['revenue'] / 1000
-        
-        bd_agregada_completa['revenue'] = bd_agregada_completa['revenue_miles']
+        # Valores en miles
+        bd_agregada_completa['revenue'] /= 1000
 
         resultados_rfm = self.procesar_rfm_por_canal(ruta_salida, bd_agregada_completa)
 
         if not resultados_rfm.empty:
             ruta_salida_final = os.path.join(ruta_salida, "rfm_resultados.xlsx")
-            resultados_rfm.to_excel(ruta_salida_final, index=False)
+            guardar_excel(resultados_rfm, ruta_salida_final)
             print(f" Resultados Rfm guardados en {ruta_salida_final}")
         
         return resultados_rfm